@@ -0,0 +1,101 @@
+"""
+Micro-batching benchmark for the SDXL dispatch stage.
+
+Drives generate_styled_image against the in-process fake SDXL endpoint with
+a steady arrival rate, once without batching and once per batch size, and
+reports completed images per endpoint-second and per-request latency. The
+fake endpoint serves FAKE_SDXL_CONCURRENCY requests at a time (default 1
+here, i.e. one GPU).
+
+    FAKE_SDXL_LATENCY=0.5 python benchmarks/batch_throughput.py --requests 64
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import httpx
+
+os.environ.setdefault("FAKE_SDXL_CONCURRENCY", "1")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import fake_sdxl  # noqa: E402
+from benchmarks.ping_latency import percentiles  # noqa: E402
+from helpers import sdxlinfer  # noqa: E402
+from helpers.batcher import MicroBatcher  # noqa: E402
+
+
+class BusyTracker(httpx.AsyncBaseTransport):
+    """Measure the wall time the endpoint spends with at least one call open."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self.transport = transport
+        self.open_calls = 0
+        self.busy = 0.0
+        self._since = 0.0
+
+    async def handle_async_request(self, request):
+        if self.open_calls == 0:
+            self._since = time.perf_counter()
+        self.open_calls += 1
+        try:
+            return await self.transport.handle_async_request(request)
+        finally:
+            self.open_calls -= 1
+            if self.open_calls == 0:
+                self.busy += time.perf_counter() - self._since
+
+
+async def run_case(batch_size: int, wait_ms: float, requests: int, interval: float):
+    tracker = BusyTracker(httpx.ASGITransport(app=fake_sdxl.app))
+    sdxlinfer.settings.sdxl_endpoint_url = "http://fake-sdxl/invocations"
+    sdxlinfer.settings.sdxl_batch_endpoint_url = None
+    sdxlinfer._client = httpx.AsyncClient(transport=tracker, timeout=None)
+    sdxlinfer._batcher = MicroBatcher(sdxlinfer._post_batch, batch_size, wait_ms, name="sdxl") if batch_size > 1 else None
+    fake_sdxl._gpu = None
+    latencies = []
+
+    async def one(i: int):
+        start = time.perf_counter()
+        result = await sdxlinfer.generate_styled_image(f"stick figure {i}", "cartoon")
+        assert result.status == "success", result.error
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    tasks = []
+    for i in range(requests):
+        tasks.append(asyncio.create_task(one(i)))
+        await asyncio.sleep(interval)
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    await sdxlinfer.close_client()
+
+    return {
+        "batch_size": batch_size,
+        "max_wait_ms": wait_ms if batch_size > 1 else 0,
+        "wall_seconds": round(elapsed, 3),
+        "endpoint_busy_seconds": round(tracker.busy, 3),
+        "images_per_endpoint_second": round(requests / tracker.busy, 3) if tracker.busy else None,
+        "latency": percentiles(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--interval", type=float, default=0.02, help="seconds between arrivals")
+    parser.add_argument("--batch-sizes", default="1,2,4,8")
+    parser.add_argument("--max-wait-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    results = [
+        asyncio.run(run_case(int(size), args.max_wait_ms, args.requests, args.interval))
+        for size in args.batch_sizes.split(",")
+    ]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+CPU and peak-memory cost of moving media through the API.
+
+Compares the previous code paths with the current ones:
+
+    generation  base64 encode in sdxlinfer + decode in main (legacy)
+                vs. passing the endpoint's PNG bytes straight through
+    gallery     stdlib JSONResponse vs. ORJSONResponse, for a metadata page
+                and for an inline (base64) page
+
+CPU is process time per call with tracing off; peak memory is the
+tracemalloc high-water mark of one call above its inputs.
+
+    python benchmarks/bench_serialization.py --image-bytes 3000000 --items 100
+"""
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def measure(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    fn()
+    start = time.process_time()
+    for _ in range(repeat):
+        fn()
+    cpu = (time.process_time() - start) / repeat
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    fn()
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return {"cpu_ms": round(cpu * 1000, 3), "peak_mb": round(peak / 2 ** 20, 2)}
+
+
+def compare(legacy: Callable[[], Any], current: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    before, after = measure(legacy, repeat), measure(current, repeat)
+    return {
+        "legacy": before,
+        "current": after,
+        "cpu_saved_pct": round((1 - after["cpu_ms"] / before["cpu_ms"]) * 100, 1) if before["cpu_ms"] else None,
+        "peak_saved_mb": round(before["peak_mb"] - after["peak_mb"], 2),
+    }
+
+
+def gallery_page(items: int, object_bytes: int, inline: bool) -> Dict[str, Any]:
+    body = os.urandom(object_bytes)
+    animations = []
+    for i in range(items):
+        item = {
+            "animation_id": f"2024-01-01T00:00:00.{i:06d}+00:00",
+            "user_id": "bench-user",
+            "filename": f"{i:032x}.png",
+            "original_filename": f"drawing-{i}.png",
+            "created_at": f"2024-01-01T00:00:00.{i:06d}+00:00",
+            "content_type": "image/png",
+            "s3_url": f"animations/bench-user/{i:032x}.png",
+            "prompt": f"stick figure number {i} doing a cartwheel",
+            "style": "cartoon",
+            "kind": "upload",
+            "derivatives": None,
+            "media_url": f"/media/bench-user/animations/{i:032x}.png",
+        }
+        if inline:
+            item["body"] = body
+        else:
+            item["url"] = f"https://stickgenusers.s3.amazonaws.com/animations/bench-user/{i:032x}.png?X-Amz-Signature={'0' * 64}"
+        animations.append(item)
+    return {"status": "success", "animations": animations, "next_cursor": None}
+
+
+def render_inline(page: Dict[str, Any], response_class, encoding: str) -> bytes:
+    animations = []
+    for item in page["animations"]:
+        item = dict(item)
+        item["image_data"] = base64.b64encode(item.pop("body")).decode(encoding)
+        animations.append(item)
+    return response_class(content={**page, "animations": animations}).body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--image-bytes", type=int, default=3 * 1024 * 1024, help="size of one generated PNG")
+    parser.add_argument("--items", type=int, default=100, help="gallery page size")
+    parser.add_argument("--object-bytes", type=int, default=64 * 1024, help="size of each inline gallery object")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    image = os.urandom(args.image_bytes)
+
+    def legacy_generation():
+        # sdxlinfer encoded for the dict result, main decoded before put_object
+        encoded = base64.b64encode(image).decode("utf-8")
+        return base64.b64decode(encoded)
+
+    def current_generation():
+        return image
+
+    metadata_page = gallery_page(args.items, args.object_bytes, inline=False)
+    inline_page = gallery_page(args.items, args.object_bytes, inline=True)
+
+    print(json.dumps({
+        "params": vars(args),
+        "generation": compare(legacy_generation, current_generation, args.repeat),
+        "gallery_metadata": compare(
+            lambda: JSONResponse(content=metadata_page).body,
+            lambda: ORJSONResponse(content=metadata_page).body,
+            args.repeat
+        ),
+        "gallery_inline": compare(
+            lambda: render_inline(inline_page, JSONResponse, "utf-8"),
+            lambda: render_inline(inline_page, ORJSONResponse, "ascii"),
+            args.repeat
+        ),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
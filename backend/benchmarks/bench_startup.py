@@ -0,0 +1,132 @@
+"""
+Cold-start cost of the API.
+
+Each sample runs in a fresh interpreter and records:
+
+    import_ms       `import main`, i.e. what a worker pays before it can bind
+    startup_ms      the lifespan hook up to the point the app serves requests
+    first_ping_ms   the first GET /ping once started
+    ready_ms        from startup until warm-up marks the app ready
+    modules         modules loaded by `import main`, and whether the imaging
+                    stack (numpy, cv2, PIL) was among them
+
+Warm-up talks to the configured AWS and SDXL endpoints; without credentials
+or network the checks fail fast and are reported, which still measures the
+app's own overhead. `--importtime` prints the slowest imports from
+`python -X importtime` instead.
+
+    python benchmarks/bench_startup.py --samples 5
+    python benchmarks/bench_startup.py --importtime
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ("numpy", "cv2", "PIL.Image")
+
+# Run in the child interpreter; prints one JSON line
+SAMPLE = """
+import asyncio, json, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+modules = len(sys.modules)
+heavy = {name: type(sys.modules.get(name)).__name__ if name in sys.modules else None for name in HEAVY}
+
+async def run():
+    import httpx
+    started = time.perf_counter()
+    async with main.app.router.lifespan_context(main.app):
+        up = time.perf_counter()
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await client.get("/ping")
+        pinged = time.perf_counter()
+        while not main.readiness["ready"] and time.perf_counter() - up < TIMEOUT:
+            await asyncio.sleep(0.005)
+        ready = time.perf_counter()
+        checks = main.readiness["checks"]
+    return up - started, pinged - up, ready - up, checks
+
+startup, ping, ready, checks = asyncio.run(run())
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "startup_ms": startup * 1000,
+    "first_ping_ms": ping * 1000,
+    "ready_ms": ready * 1000,
+    "modules": modules,
+    "heavy_modules": heavy,
+    "checks": checks,
+}))
+"""
+
+
+def sample(timeout: float) -> Dict[str, Any]:
+    code = f"HEAVY = {HEAVY_MODULES!r}\nTIMEOUT = {timeout!r}\n" + SAMPLE
+    env = {**os.environ, "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING")}
+    proc = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    return {
+        "median": round(statistics.median(values), 2),
+        "min": round(min(values), 2),
+        "max": round(max(values), 2),
+    }
+
+
+def importtime(top: int):
+    """Print the modules with the largest cumulative import time."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        rows.append((int(cumulative_us), int(self_us), name))
+    rows.sort(reverse=True)
+    print(f"{'cumulative ms':>14}{'self ms':>10}  module")
+    for cumulative_us, self_us, name in rows[:top]:
+        print(f"{cumulative_us / 1000:>14.1f}{self_us / 1000:>10.1f}  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=5, help="fresh interpreters to start")
+    parser.add_argument("--ready-timeout", type=float, default=10.0, help="seconds to wait for warm-up")
+    parser.add_argument("--importtime", action="store_true", help="print the slowest imports and exit")
+    parser.add_argument("--top", type=int, default=25)
+    args = parser.parse_args()
+
+    if args.importtime:
+        importtime(args.top)
+        return
+
+    samples = [sample(args.ready_timeout) for _ in range(args.samples)]
+    print(json.dumps({
+        "params": vars(args),
+        **{
+            key: summarize([s[key] for s in samples])
+            for key in ("import_ms", "startup_ms", "first_ping_ms", "ready_ms")
+        },
+        "modules": samples[-1]["modules"],
+        "heavy_modules": samples[-1]["heavy_modules"],
+        "checks": samples[-1]["checks"],
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
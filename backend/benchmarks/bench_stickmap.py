@@ -0,0 +1,88 @@
+"""
+Throughput benchmark for the stick-figure extraction engine.
+
+Renders synthetic stick-figure drawings, then times extract_skeletons in
+one process and extract_skeletons_parallel across worker processes, and
+prints images/sec overall and per core as JSON.
+
+    python benchmarks/bench_stickmap.py --images 512 --workers 4
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helpers.stickmap import extract_skeletons, extract_skeletons_parallel  # noqa: E402
+
+
+def synthetic_figures(count: int, width: int, height: int, seed: int = 0):
+    """Black-on-white stick figures with random limb angles and stroke widths."""
+    rng = np.random.default_rng(seed)
+    images = []
+    for _ in range(count):
+        image = np.full((height, width, 3), 255, dtype=np.uint8)
+        thickness = int(rng.integers(4, 12))
+        cx = width // 2
+        neck = (cx, int(height * 0.3))
+        hip = (cx, int(height * 0.6))
+        cv2.circle(image, (cx, int(height * 0.18)), int(height * 0.08), (0, 0, 0), thickness)
+        cv2.line(image, neck, hip, (0, 0, 0), thickness)
+        for origin, length in ((neck, height * 0.22), (neck, height * 0.22), (hip, height * 0.35), (hip, height * 0.35)):
+            angle = rng.uniform(0.2, np.pi - 0.2)
+            end = (int(origin[0] + length * np.cos(angle)), int(origin[1] + length * np.sin(angle)))
+            cv2.line(image, origin, end, (0, 0, 0), thickness)
+        images.append(image)
+    return images
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=256)
+    parser.add_argument("--width", type=int, default=512)
+    parser.add_argument("--height", type=int, default=512)
+    parser.add_argument("--size", type=int, default=256, help="working grid side")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=32)
+    args = parser.parse_args()
+
+    images = synthetic_figures(args.images, args.width, args.height)
+    # Warm up imports and allocator
+    extract_skeletons(images[:4], args.size)
+
+    skeletons, serial = timed(extract_skeletons, images, args.size)
+    _, parallel = timed(extract_skeletons_parallel, images, args.size, args.workers, args.chunk_size)
+
+    print(json.dumps({
+        "images": args.images,
+        "input_size": [args.width, args.height],
+        "working_size": args.size,
+        "mean_joints": float(np.mean([len(s.joints) for s in skeletons])),
+        "mean_limbs": float(np.mean([len(s.limbs) for s in skeletons])),
+        "serial": {
+            "seconds": round(serial, 4),
+            "images_per_sec": round(args.images / serial, 1),
+            "images_per_sec_per_core": round(args.images / serial, 1),
+        },
+        "parallel": {
+            "workers": args.workers,
+            "seconds": round(parallel, 4),
+            "images_per_sec": round(args.images / parallel, 1),
+            "images_per_sec_per_core": round(args.images / parallel / args.workers, 1),
+        },
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
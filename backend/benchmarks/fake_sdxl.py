@@ -0,0 +1,82 @@
+"""
+Local stand-in for the SDXL inference endpoint.
+
+Accepts the same JSON payload as the SageMaker endpoint and answers with a
+PNG after an artificial delay, so the API can be exercised without a GPU.
+A list under "inputs" is treated as a batch and answered with
+{"images": [<base64 PNG>, ...]}; each extra batch item adds
+FAKE_SDXL_BATCH_COST of the single-image latency, mimicking a GPU that is
+more efficient on larger batches.
+
+    FAKE_SDXL_LATENCY=5 uvicorn benchmarks.fake_sdxl:app --port 8081
+    SDXL_ENDPOINT_URL=http://127.0.0.1:8081/invocations uvicorn main:app
+"""
+import asyncio
+import base64
+import os
+import struct
+import zlib
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+LATENCY = float(os.environ.get("FAKE_SDXL_LATENCY", "2.0"))
+# Overrides the requested width/height when set, to control payload size
+IMAGE_SIZE = int(os.environ.get("FAKE_SDXL_SIZE", "0"))
+BATCH_COST = float(os.environ.get("FAKE_SDXL_BATCH_COST", "0.25"))
+# Number of requests the "GPU" works on at once; 0 means unlimited
+CONCURRENCY = int(os.environ.get("FAKE_SDXL_CONCURRENCY", "0"))
+
+_gpu = None
+
+
+async def run_on_gpu(seconds: float):
+    global _gpu
+    if CONCURRENCY <= 0:
+        await asyncio.sleep(seconds)
+        return
+    if _gpu is None:
+        _gpu = asyncio.Semaphore(CONCURRENCY)
+    async with _gpu:
+        await asyncio.sleep(seconds)
+
+
+def make_png(width: int, height: int) -> bytes:
+    """Encode a noisy RGB image as PNG using only the stdlib."""
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return (
+            struct.pack(">I", len(data)) + tag + data
+            + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+        )
+
+    raw = b"".join(b"\x00" + os.urandom(width * 3) for _ in range(height))
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(raw, 1))
+        + chunk(b"IEND", b"")
+    )
+
+
+async def invocations(request: Request) -> Response:
+    payload = await request.json()
+    parameters = payload.get("parameters", {})
+    width = IMAGE_SIZE or int(parameters.get("width", 1024))
+    height = IMAGE_SIZE or int(parameters.get("height", 1024))
+    inputs = payload.get("inputs")
+    if isinstance(inputs, list):
+        await run_on_gpu(LATENCY * (1 + BATCH_COST * (len(inputs) - 1)))
+        return JSONResponse({
+            "images": [base64.b64encode(make_png(width, height)).decode("utf-8") for _ in inputs]
+        })
+
+    await run_on_gpu(LATENCY)
+    return Response(make_png(width, height), media_type="image/png")
+
+
+app = Starlette(routes=[
+    Route("/invocations", invocations, methods=["POST"]),
+])
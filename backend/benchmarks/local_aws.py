@@ -0,0 +1,333 @@
+"""
+In-memory stand-ins for the S3 client and DynamoDB table used by the API.
+
+Only the calls the backend makes are implemented, with the same argument
+names and response shapes as boto3, so the app code runs unchanged. They
+cost microseconds rather than a network round trip, which keeps benchmark
+numbers about the API itself; use --downstream-latency in the suite to add
+a fixed delay per call.
+"""
+import hashlib
+import io
+import re
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from botocore.exceptions import ClientError
+from botocore.response import StreamingBody
+
+
+def _client_error(code: str, operation: str, message: str = "") -> ClientError:
+    return ClientError({"Error": {"Code": code, "Message": message or code}}, operation)
+
+
+class FakeS3Client:
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self._objects: Dict[tuple, Dict[str, Any]] = {}
+        self._uploads: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def _call(self):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _store(self, bucket: str, key: str, body: bytes, content_type: Optional[str],
+               metadata: Optional[Dict[str, str]], cache_control: Optional[str] = None) -> str:
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        with self._lock:
+            self._objects[(bucket, key)] = {
+                "body": body,
+                "content_type": content_type or "binary/octet-stream",
+                "metadata": dict(metadata or {}),
+                "cache_control": cache_control,
+                "last_modified": datetime.now(timezone.utc).replace(microsecond=0),
+                "etag": etag
+            }
+        return etag
+
+    def _get(self, bucket: str, key: str, operation: str, missing_code: str) -> Dict[str, Any]:
+        with self._lock:
+            entry = self._objects.get((bucket, key))
+        if entry is None:
+            raise _client_error(missing_code, operation, f"{key} not found")
+        return entry
+
+    def _head(self, entry: Dict[str, Any], length: int) -> Dict[str, Any]:
+        head = {
+            "ContentType": entry["content_type"],
+            "ContentLength": length,
+            "ETag": entry["etag"],
+            "LastModified": entry["last_modified"],
+            "Metadata": dict(entry["metadata"])
+        }
+        if entry["cache_control"]:
+            head["CacheControl"] = entry["cache_control"]
+        return head
+
+    def put_object(self, Bucket, Key, Body=b"", ContentType=None, Metadata=None, CacheControl=None, **kwargs):
+        self._call()
+        body = Body.read() if hasattr(Body, "read") else bytes(Body)
+        return {"ETag": self._store(Bucket, Key, body, ContentType, Metadata, CacheControl)}
+
+    def get_object(self, Bucket, Key, Range=None, IfNoneMatch=None, IfMatch=None, **kwargs):
+        self._call()
+        entry = self._get(Bucket, Key, "GetObject", "NoSuchKey")
+        if IfMatch is not None and IfMatch != entry["etag"]:
+            raise _client_error("PreconditionFailed", "GetObject")
+        if IfNoneMatch is not None and IfNoneMatch in ("*", entry["etag"]):
+            raise _client_error("304", "GetObject", "Not Modified")
+        body = entry["body"]
+        response = {}
+        if Range:
+            start, _, end = Range[len("bytes="):].partition("-")
+            if start:
+                first, last = int(start), int(end) if end else len(body) - 1
+            else:
+                first, last = max(0, len(body) - int(end)), len(body) - 1
+            if first >= len(body):
+                raise _client_error("InvalidRange", "GetObject")
+            last = min(last, len(body) - 1)
+            response["ContentRange"] = f"bytes {first}-{last}/{len(body)}"
+            body = body[first:last + 1]
+        response.update(self._head(entry, len(body)))
+        response["Body"] = StreamingBody(io.BytesIO(body), len(body))
+        return response
+
+    def head_object(self, Bucket, Key, **kwargs):
+        self._call()
+        entry = self._get(Bucket, Key, "HeadObject", "404")
+        return self._head(entry, len(entry["body"]))
+
+    def delete_object(self, Bucket, Key, **kwargs):
+        self._call()
+        with self._lock:
+            self._objects.pop((Bucket, Key), None)
+        return {}
+
+    def copy_object(self, Bucket, Key, CopySource, MetadataDirective="COPY", **kwargs):
+        self._call()
+        entry = self._get(CopySource["Bucket"], CopySource["Key"], "CopyObject", "NoSuchKey")
+        etag = self._store(Bucket, Key, entry["body"], entry["content_type"], entry["metadata"], entry["cache_control"])
+        return {"CopyObjectResult": {"ETag": etag}}
+
+    def download_file(self, Bucket, Key, Filename, **kwargs):
+        entry = self._get(Bucket, Key, "GetObject", "404")
+        with open(Filename, "wb") as f:
+            shutil.copyfileobj(io.BytesIO(entry["body"]), f)
+
+    def create_multipart_upload(self, Bucket, Key, ContentType=None, Metadata=None, **kwargs):
+        self._call()
+        upload_id = uuid.uuid4().hex
+        with self._lock:
+            self._uploads[upload_id] = {"content_type": ContentType, "metadata": Metadata, "parts": {}}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body, **kwargs):
+        self._call()
+        body = Body.read() if hasattr(Body, "read") else bytes(Body)
+        with self._lock:
+            self._uploads[UploadId]["parts"][PartNumber] = body
+        return {"ETag": '"' + hashlib.md5(body).hexdigest() + '"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload, **kwargs):
+        self._call()
+        with self._lock:
+            upload = self._uploads.pop(UploadId)
+        body = b"".join(upload["parts"][part["PartNumber"]] for part in MultipartUpload["Parts"])
+        return {"ETag": self._store(Bucket, Key, body, upload["content_type"], upload["metadata"])}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId, **kwargs):
+        self._call()
+        with self._lock:
+            self._uploads.pop(UploadId, None)
+        return {}
+
+    def generate_presigned_url(self, ClientMethod, Params=None, ExpiresIn=3600, **kwargs):
+        params = Params or {}
+        return f"https://{params.get('Bucket')}.s3.local/{params.get('Key')}?X-Amz-Expires={ExpiresIn}"
+
+    def generate_presigned_post(self, Bucket, Key, Fields=None, Conditions=None, ExpiresIn=3600):
+        return {"url": f"https://{Bucket}.s3.local/", "fields": {**(Fields or {}), "key": Key}}
+
+
+# `<name> = :v`, optionally `AND <range> BETWEEN :a AND :b` or `AND <range> <op> :v`
+_KEY_CONDITION = re.compile(
+    r"^\s*(\w+)\s*=\s*(:\w+)\s*"
+    r"(?:AND\s+(\w+)\s+(?:BETWEEN\s+(:\w+)\s+AND\s+(:\w+)|(<=|>=|<|>|=)\s*(:\w+)))?\s*$"
+)
+
+_COMPARISONS = {
+    "=": lambda a, b: a == b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+}
+
+
+class FakeTable:
+    """
+    Subset of a boto3 DynamoDB Table keyed on (user_id, creation_id).
+
+    `indexes` maps a GSI name to its (hash key, range key); like DynamoDB,
+    items missing the index's hash key are left out of it. Indexes project
+    all attributes, and range values are assumed unique within an index
+    partition, as they are for `user_style`.
+    """
+
+    def __init__(self, latency: float = 0.0, hash_key: str = "user_id", range_key: str = "creation_id",
+                 name: str = "stickgen_animations", indexes: Optional[Dict[str, tuple]] = None):
+        self.latency = latency
+        self.name = name
+        self.hash_key = hash_key
+        self.range_key = range_key
+        self.indexes = indexes if indexes is not None else {"user_style-creation_id-index": ("user_style", "creation_id")}
+        self._items: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        # Index name -> hash value -> range value -> item, kept in step with _items
+        self._index_items: Dict[str, Dict[Any, Dict[str, Dict[str, Any]]]] = {name: {} for name in self.indexes}
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def _call(self):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _unindex(self, item: Optional[Dict[str, Any]]):
+        if item is None:
+            return
+        for name, (hash_key, range_key) in self.indexes.items():
+            if hash_key in item:
+                self._index_items[name].get(item[hash_key], {}).pop(item[range_key], None)
+
+    def _index(self, item: Dict[str, Any]):
+        for name, (hash_key, range_key) in self.indexes.items():
+            if hash_key in item:
+                self._index_items[name].setdefault(item[hash_key], {})[item[range_key]] = item
+
+    def put_item(self, Item, ConditionExpression=None, **kwargs):
+        """Supports `attribute_not_exists(<key>)` as the only condition."""
+        self._call()
+        item = dict(Item)
+        if ConditionExpression is not None and not re.fullmatch(r"attribute_not_exists\(\w+\)", ConditionExpression):
+            raise NotImplementedError(ConditionExpression)
+        with self._lock:
+            partition = self._items.setdefault(Item[self.hash_key], {})
+            if ConditionExpression is not None and Item[self.range_key] in partition:
+                raise _client_error("ConditionalCheckFailedException", "PutItem", "The conditional request failed")
+            self._unindex(partition.get(Item[self.range_key]))
+            partition[Item[self.range_key]] = item
+            self._index(item)
+        return {}
+
+    def get_item(self, Key, **kwargs):
+        self._call()
+        with self._lock:
+            item = self._items.get(Key[self.hash_key], {}).get(Key[self.range_key])
+        return {"Item": dict(item)} if item is not None else {}
+
+    def delete_item(self, Key, **kwargs):
+        self._call()
+        with self._lock:
+            self._unindex(self._items.get(Key[self.hash_key], {}).pop(Key[self.range_key], None))
+        return {}
+
+    def update_item(self, Key, UpdateExpression, ExpressionAttributeValues, **kwargs):
+        """Supports `SET a = :x, b = :y` expressions."""
+        self._call()
+        if not UpdateExpression.startswith("SET "):
+            raise NotImplementedError(UpdateExpression)
+        with self._lock:
+            item = self._items.setdefault(Key[self.hash_key], {}).setdefault(Key[self.range_key], dict(Key))
+            self._unindex(item)
+            for assignment in UpdateExpression[len("SET "):].split(","):
+                name, value = (part.strip() for part in assignment.split("="))
+                item[name] = ExpressionAttributeValues[value]
+            self._index(item)
+        return {}
+
+    def query(self, KeyConditionExpression, ExpressionAttributeValues, ScanIndexForward=True,
+              Limit=None, ExclusiveStartKey=None, IndexName=None, FilterExpression=None,
+              ExpressionAttributeNames=None, **kwargs):
+        """
+        Supports `<hash> = :v` with an optional BETWEEN or comparison on the
+        range key, on the table or one of its indexes, and a FilterExpression
+        of the form `<name> = :v`. As in DynamoDB, the filter runs after
+        Limit, so pages can come back short.
+        """
+        self._call()
+        match = _KEY_CONDITION.match(KeyConditionExpression)
+        hash_key, range_key = self.indexes[IndexName] if IndexName else (self.hash_key, self.range_key)
+        if match is None or match.group(1) != hash_key or match.group(3) not in (None, range_key):
+            raise NotImplementedError(KeyConditionExpression)
+        values = ExpressionAttributeValues
+        keep = lambda item: True
+        if FilterExpression is not None:
+            names = ExpressionAttributeNames or {}
+            filter_match = re.fullmatch(r"\s*([#\w]+)\s*=\s*(:\w+)\s*", FilterExpression)
+            if filter_match is None:
+                raise NotImplementedError(FilterExpression)
+            attribute = names.get(filter_match.group(1), filter_match.group(1))
+            keep = lambda item: item.get(attribute) == values[filter_match.group(2)]
+        hash_value = values[match.group(2)]
+        if match.group(4):
+            low, high = values[match.group(4)], values[match.group(5)]
+            in_range = lambda key: low <= key <= high
+        elif match.group(6):
+            compare, operand = _COMPARISONS[match.group(6)], values[match.group(7)]
+            in_range = lambda key: compare(key, operand)
+        else:
+            in_range = lambda key: True
+
+        with self._lock:
+            if IndexName:
+                partition = self._index_items[IndexName].get(hash_value, {})
+            else:
+                partition = self._items.get(hash_value, {})
+            keys: List[str] = sorted((k for k in partition if in_range(k)), reverse=not ScanIndexForward)
+            if ExclusiveStartKey:
+                start = ExclusiveStartKey[range_key]
+                keys = [k for k in keys if (k < start if not ScanIndexForward else k > start)]
+            page = keys[:Limit] if Limit else keys
+            items = [dict(partition[k]) for k in page]
+
+        response = {"Items": [item for item in items if keep(item)]}
+        response["Count"] = len(response["Items"])
+        if Limit and len(keys) > Limit:
+            last = items[-1]
+            response["LastEvaluatedKey"] = {self.hash_key: last[self.hash_key], self.range_key: last[self.range_key]}
+            if IndexName:
+                response["LastEvaluatedKey"][hash_key] = last[hash_key]
+        return response
+
+
+class FakeDynamoDB:
+    """The `dynamodb` resource calls made outside a single table."""
+
+    def __init__(self, *tables: FakeTable):
+        self.tables = {table.name: table for table in tables}
+
+    def Table(self, name: str) -> FakeTable:
+        return self.tables[name]
+
+    def batch_get_item(self, RequestItems, **kwargs):
+        responses = {}
+        for name, request in RequestItems.items():
+            table = self.tables[name]
+            if len(request["Keys"]) > 100:
+                raise _client_error("ValidationException", "BatchGetItem", "Too many items requested")
+            table._call()
+            with table._lock:
+                found = [
+                    table._items.get(key[table.hash_key], {}).get(key[table.range_key])
+                    for key in request["Keys"]
+                ]
+            responses[name] = [dict(item) for item in found if item is not None]
+        return {"Responses": responses, "UnprocessedKeys": {}}
@@ -0,0 +1,88 @@
+"""
+Load test: /ping latency while generations are in flight.
+
+Start the fake SDXL endpoint and the API pointed at it, then run:
+
+    FAKE_SDXL_LATENCY=5 uvicorn benchmarks.fake_sdxl:app --port 8081
+    SDXL_ENDPOINT_URL=http://127.0.0.1:8081/invocations uvicorn main:app --port 8000
+    python benchmarks/ping_latency.py --generations 16
+
+The script measures /ping on an idle server first and then again while the
+generation requests are outstanding. On a non-blocking server both p99
+figures should be in the same range.
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Dict, List
+
+import httpx
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    if not ordered:
+        return {}
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 2)
+
+    return {
+        "count": len(ordered),
+        "p50_ms": pick(0.50),
+        "p95_ms": pick(0.95),
+        "p99_ms": pick(0.99),
+        "max_ms": round(ordered[-1] * 1000, 2),
+    }
+
+
+async def sample_ping(client: httpx.AsyncClient, duration: float, interval: float) -> List[float]:
+    samples = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await client.get("/ping")
+        response.raise_for_status()
+        samples.append(time.perf_counter() - start)
+        await asyncio.sleep(interval)
+    return samples
+
+
+async def run(args) -> Dict:
+    async with httpx.AsyncClient(base_url=args.api_url, timeout=None) as client:
+        idle = await sample_ping(client, args.duration, args.interval)
+
+        generations = [
+            asyncio.create_task(client.post(
+                f"/generate/{args.user_id}",
+                params={"style": "cartoon"},
+                json={"prompt": f"stick figure waving {i}"},
+            ))
+            for i in range(args.generations)
+        ]
+        loaded = await sample_ping(client, args.duration, args.interval)
+        statuses = [r.status_code if isinstance(r, httpx.Response) else repr(r)
+                    for r in await asyncio.gather(*generations, return_exceptions=True)]
+
+    return {
+        "idle": percentiles(idle),
+        "under_load": percentiles(loaded),
+        "generations": args.generations,
+        "generation_statuses": statuses,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--api-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--user-id", default="loadtest")
+    parser.add_argument("--generations", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds of ping sampling per phase")
+    parser.add_argument("--interval", type=float, default=0.01)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
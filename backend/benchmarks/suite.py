@@ -0,0 +1,346 @@
+"""
+Offline benchmark suite for the API.
+
+Runs the FastAPI app in-process against in-memory S3/DynamoDB stand-ins
+(benchmarks/local_aws.py) and the fake SDXL endpoint, drives a set of
+request mixes and writes throughput, latency percentiles and peak RSS per
+scenario to a JSON file. Inputs are seeded, so two runs on the same commit
+and machine are comparable; pass --compare to diff against an earlier file.
+
+Scenarios:
+    gallery     GET /gallery for users with 10, 100 and 1000 items, both the
+                paginated metadata response and the inline (base64) one
+    upload      concurrent multipart/form-data POST /upload, one size that
+                goes to S3 in a single put and one above upload_chunk_bytes
+                that takes the multipart-upload path
+    generation  a burst of concurrent POST /generate calls
+    media       full and ranged GET /media reads of one large video
+    search      GET /search by date range, style and keyword for users with
+                1000 and 10000 items
+
+    python benchmarks/suite.py --output bench.json
+    python benchmarks/suite.py --scenarios gallery --compare bench.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+SCENARIOS = ("gallery", "upload", "generation", "media", "search")
+
+ACTIONS = ("jumping", "running", "dancing", "waving", "falling", "climbing", "juggling", "skating")
+STYLES = ("anime", "cartoon", "realistic")
+
+
+class RssSampler:
+    """Track the peak resident set size while a scenario runs."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._page_size = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+    def _rss(self) -> int:
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * self._page_size
+        except OSError:
+            # No procfs: fall back to the process-lifetime peak
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self._rss())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = self._rss()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self._rss())
+
+
+async def drive(
+    request: Callable[[int], Awaitable[httpx.Response]],
+    total: int,
+    concurrency: int
+) -> Dict[str, Any]:
+    """Issue `total` requests from `concurrency` workers and time each one."""
+    from benchmarks.ping_latency import percentiles
+
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    counter = iter(range(total))
+
+    async def worker():
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                response = await request(i)
+                ok = response.status_code < 400
+                outcome = str(response.status_code)
+            except Exception as e:
+                ok, outcome = False, type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            if not ok:
+                errors[outcome] = errors.get(outcome, 0) + 1
+
+    with RssSampler() as rss:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+        wall = time.perf_counter() - start
+
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "errors": errors,
+        "wall_seconds": round(wall, 4),
+        "throughput_rps": round(total / wall, 2) if wall else None,
+        "latency": percentiles(latencies),
+        "peak_rss_mb": round(rss.peak / 2 ** 20, 1),
+    }
+
+
+def seed_gallery(s3, table, bucket: str, user_id: str, items: int, object_bytes: int, rng: random.Random):
+    """Write `items` uploads for a user straight into the stand-ins."""
+    for i in range(items):
+        filename = f"{rng.getrandbits(128):032x}.png"
+        if object_bytes:
+            s3.put_object(Bucket=bucket, Key=f"animations/{user_id}/{filename}",
+                          Body=rng.randbytes(object_bytes), ContentType="image/png")
+        style = rng.choice(STYLES)
+        table.put_item(Item={
+            "user_id": user_id,
+            # One item an hour, so date ranges select predictable slices
+            "creation_id": datetime.fromtimestamp(1704067200 + i * 3600, timezone.utc).isoformat(),
+            "filename": filename,
+            "original_filename": f"drawing-{i}.png",
+            "content_type": "image/png",
+            "prompt": f"stick figure {i} {rng.choice(ACTIONS)} {rng.choice(ACTIONS)}",
+            "style": style,
+            "user_style": f"{user_id}#{style}",
+        })
+
+
+async def run_suite(args) -> Dict[str, Any]:
+    import main
+    from benchmarks import fake_sdxl
+    from benchmarks.local_aws import FakeDynamoDB, FakeS3Client, FakeTable
+    from helpers import sdxlinfer
+
+    rng = random.Random(args.seed)
+    bucket = main.settings.S3_BUCKET_NAME
+    s3 = FakeS3Client(latency=args.downstream_latency)
+    table = FakeTable(latency=args.downstream_latency)
+    results: Dict[str, Any] = {}
+
+    async with main.app.router.lifespan_context(main.app):
+        # Swap the stand-ins into every module-level client the app holds
+        main.s3_client = s3
+        main.table = table
+        main.dynamodb = FakeDynamoDB(table)
+        if main.prompt_index is not None:
+            main.prompt_index.table = table
+        main.s3_fetcher.s3_client = s3
+        if main.generation_cache is not None:
+            main.generation_cache.s3_client = s3
+        if args.derivatives and main.derivative_pipeline is not None:
+            main.derivative_pipeline.s3_client = s3
+            main.derivative_pipeline.table = table
+        else:
+            main.derivative_pipeline = None
+        sdxlinfer.settings.sdxl_endpoint_url = "http://fake-sdxl/invocations"
+        sdxlinfer._client = httpx.AsyncClient(transport=httpx.ASGITransport(app=fake_sdxl.app), timeout=None)
+
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            if "gallery" in args.scenarios:
+                for size in args.gallery_sizes:
+                    user_id = f"gallery-{size}"
+                    seed_gallery(s3, table, bucket, user_id, size, args.object_bytes, rng)
+                    results[f"gallery_metadata_{size}"] = await drive(
+                        lambda i, u=user_id: client.get(f"/gallery/{u}"),
+                        args.requests, args.concurrency
+                    )
+                    # Inline responses carry every object; scale the count down
+                    results[f"gallery_inline_{size}"] = await drive(
+                        lambda i, u=user_id: client.get(f"/gallery/{u}", params={"inline": "true"}),
+                        max(args.concurrency, args.requests * 10 // max(size, 10)), args.concurrency
+                    )
+
+            if "upload" in args.scenarios:
+                for size in args.upload_sizes:
+                    body = rng.randbytes(size)
+                    results[f"upload_{size}"] = await drive(
+                        lambda i, b=body: client.post("/upload/uploader", files={"file": (f"clip-{i}.png", b, "image/png")}),
+                        args.uploads, args.concurrency
+                    )
+
+            if "generation" in args.scenarios:
+                # Every prompt distinct unless --distinct-prompts asks for repeats
+                distinct = args.distinct_prompts or args.generations
+                results["generation_burst"] = await drive(
+                    lambda i: client.post(
+                        "/generate/generator",
+                        params={"style": "cartoon"},
+                        json={"prompt": f"stick figure jumping {i % distinct}"}
+                    ),
+                    args.generations, args.generations
+                )
+
+            if "media" in args.scenarios:
+                key = "animations/viewer/clip.mp4"
+                s3.put_object(Bucket=bucket, Key=key, Body=rng.randbytes(args.media_bytes), ContentType="video/mp4")
+                results["media_full"] = await drive(
+                    lambda i: client.get("/media/viewer/animations/clip.mp4"),
+                    args.requests // 4 or 1, args.concurrency
+                )
+                # Seeks as a video element issues them: 1 MiB windows at random offsets
+                offsets = [rng.randrange(args.media_bytes) for _ in range(args.requests)]
+                results["media_range"] = await drive(
+                    lambda i: client.get(
+                        "/media/viewer/animations/clip.mp4",
+                        headers={"Range": f"bytes={offsets[i]}-{offsets[i] + 2 ** 20 - 1}"}
+                    ),
+                    args.requests, args.concurrency
+                )
+
+            if "search" in args.scenarios:
+                for size in args.search_sizes:
+                    user_id = f"search-{size}"
+                    seed_gallery(s3, table, bucket, user_id, size, 0, rng)
+                    # A week of items, wherever the library ends
+                    since = datetime.fromtimestamp(1704067200 + max(0, size - 168) * 3600, timezone.utc).isoformat()
+                    results[f"search_date_{size}"] = await drive(
+                        lambda i, u=user_id: client.get(f"/search/{u}", params={"since": since}),
+                        args.requests, args.concurrency
+                    )
+                    results[f"search_style_{size}"] = await drive(
+                        lambda i, u=user_id: client.get(f"/search/{u}", params={"style": STYLES[i % len(STYLES)]}),
+                        args.requests, args.concurrency
+                    )
+                    # The first request builds the user's prompt index
+                    results[f"search_keyword_{size}"] = await drive(
+                        lambda i, u=user_id: client.get(
+                            f"/search/{u}",
+                            params={"q": f"{ACTIONS[i % len(ACTIONS)]} {ACTIONS[(i * 3 + 1) % len(ACTIONS)]}"}
+                        ),
+                        args.requests, args.concurrency
+                    )
+
+    return results
+
+
+def git_revision() -> Dict[str, Any]:
+    def git(*argv: str) -> str:
+        return subprocess.run(["git", *argv], cwd=BACKEND_DIR, capture_output=True, text=True, check=True).stdout.strip()
+
+    try:
+        return {"commit": git("rev-parse", "HEAD"), "dirty": bool(git("status", "--porcelain", "--", "."))}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+
+def compare(current: Dict[str, Any], baseline_path: str):
+    """Print throughput and p95 changes against an earlier results file."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)["scenarios"]
+    print(f"{'scenario':<26}{'rps':>12}{'Δ rps':>10}{'p95 ms':>12}{'Δ p95':>10}")
+    for name, result in current.items():
+        before = baseline.get(name)
+        rps, p95 = result["throughput_rps"], result["latency"].get("p95_ms")
+        if before is None:
+            print(f"{name:<26}{rps:>12}{'new':>10}{p95:>12}{'new':>10}")
+            continue
+
+        def delta(now, then):
+            return f"{(now - then) / then * 100:+.1f}%" if then else "n/a"
+        print(f"{name:<26}{rps:>12}{delta(rps, before['throughput_rps']):>10}"
+              f"{p95:>12}{delta(p95, before['latency'].get('p95_ms')):>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="bench-results.json")
+    parser.add_argument("--compare", help="earlier results file to diff against")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="requests per gallery scenario")
+    parser.add_argument("--gallery-sizes", default="10,100,1000")
+    parser.add_argument("--search-sizes", default="1000,10000")
+    parser.add_argument("--object-bytes", type=int, default=16 * 1024, help="size of each seeded gallery object")
+    parser.add_argument("--uploads", type=int, default=64)
+    parser.add_argument("--upload-sizes", default=f"{2 * 1024 * 1024},{20 * 1024 * 1024}",
+                        help="upload body sizes; keep one above UPLOAD_CHUNK_BYTES (8 MiB) for multipart")
+    parser.add_argument("--generations", type=int, default=32, help="size of the generation burst")
+    parser.add_argument("--distinct-prompts", type=int, default=0, help="repeat prompts to exercise coalescing")
+    parser.add_argument("--sdxl-latency", type=float, default=0.25, help="fake SDXL seconds per image")
+    parser.add_argument("--sdxl-size", type=int, default=256, help="fake SDXL image side in pixels")
+    parser.add_argument("--downstream-latency", type=float, default=0.0, help="seconds added to every S3/DynamoDB call")
+    parser.add_argument("--media-bytes", type=int, default=8 * 1024 * 1024, help="size of the streamed video")
+    parser.add_argument("--derivatives", action="store_true", help="keep the thumbnail pipeline enabled")
+    args = parser.parse_args()
+    args.scenarios = [name for name in args.scenarios.split(",") if name]
+    args.gallery_sizes = [int(size) for size in args.gallery_sizes.split(",")]
+    args.search_sizes = [int(size) for size in args.search_sizes.split(",")]
+    args.upload_sizes = [int(size) for size in args.upload_sizes.split(",")]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    # Read at import time by the fake endpoint and the app's settings
+    os.environ["FAKE_SDXL_LATENCY"] = str(args.sdxl_latency)
+    os.environ["FAKE_SDXL_SIZE"] = str(args.sdxl_size)
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    # The stand-ins are swapped in after startup; don't warm the real services
+    os.environ.setdefault("WARMUP_ENABLED", "false")
+    # FakeTable implements the style index
+    os.environ.setdefault("SEARCH_STYLE_INDEX", "user_style-creation_id-index")
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+
+    scenarios = asyncio.run(run_suite(args))
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        },
+        "scenarios": scenarios,
+        "process_peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+    if args.compare:
+        compare(scenarios, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,51 @@ class Settings(BaseSettings):
     dynamodb_table_name: str = "stickgen_animations"
     api_url: str = "http://localhost:8000"
     node_env: str = "development"
+    gallery_page_size: int = 24
+    gallery_max_page_size: int = 100
+    presigned_url_expiry: int = 3600
+    upload_max_bytes: int = 500 * 1024 * 1024
+    upload_chunk_bytes: int = 8 * 1024 * 1024
+    derivatives_enabled: bool = True
+    derivative_workers: int = 2
+    thumbnail_size: int = 256
+    poster_size: int = 1280
+    s3_fetch_max_workers: int = 32
+    s3_fetch_concurrency: int = 8
+    s3_fetch_timeout: float = 10.0
+    sdxl_endpoint_url: str = "https://runtime.sagemaker.us-east-1:891612544795:endpoint/jumpstart-dft-stabilityai-sdxl-1-0-20241207-064752"
+    sdxl_timeout: float = 120.0
+    sdxl_max_connections: int = 8
+    sdxl_batch_enabled: bool = False
+    sdxl_batch_endpoint_url: Optional[str] = None
+    sdxl_batch_max_size: int = 4
+    sdxl_batch_max_wait_ms: float = 25.0
+    redis_url: Optional[str] = None
+    generation_workers: int = 2
+    job_ttl: int = 3600
+    job_poll_interval: float = 0.5
+    generation_cache_enabled: bool = False
+    generation_cache_max_entries: int = 1024
+    generation_cache_ttl: int = 86400
+    gallery_cache_enabled: bool = True
+    gallery_cache_max_entries: int = 1024
+    gallery_cache_ttl: int = 30
+    # Total page text each worker keeps in memory; larger pages keep only their validators
+    gallery_cache_max_bytes: int = 64 * 1024 * 1024
+    gallery_cache_page_max_bytes: int = 1024 * 1024
+    media_chunk_bytes: int = 256 * 1024
+    media_cache_max_age: int = 31536000
+    log_level: str = "INFO"
+    warmup_enabled: bool = True
+    warmup_timeout: float = 5.0
+    warmup_retry_max_interval: float = 30.0
+    # GSI on user_style (hash) / creation_id (range), projection ALL, made by
+    # scripts/style_index.py. Unset: style search filters the base table
+    search_style_index: Optional[str] = None
+    search_page_size: int = 24
+    search_index_enabled: bool = True
+    search_index_max_users: int = 256
+    search_index_ttl: int = 300
     
     class Config:
         env_file = ".env"
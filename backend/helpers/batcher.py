@@ -0,0 +1,85 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from helpers.metrics import BATCH_SIZE
+
+
+class MicroBatcher:
+    """
+    Gather concurrent requests into batches for a single downstream call.
+
+    Items submitted for the same `group` key are collected until either
+    `max_batch_size` items are waiting or the oldest one has waited
+    `max_wait_ms`, then handed to `dispatch` together. `dispatch` must
+    return one result per item, in order; results may be Exception
+    instances to fail individual items. With a `name`, batch sizes are
+    recorded in the stickgen_batch_size metric.
+    """
+
+    def __init__(
+        self,
+        dispatch: Callable[[str, List[Any]], Awaitable[List[Any]]],
+        max_batch_size: int = 4,
+        max_wait_ms: float = 25.0,
+        name: Optional[str] = None
+    ):
+        self.dispatch = dispatch
+        self.name = name
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self._pending: Dict[str, List[Tuple[Any, asyncio.Future]]] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        # Keep references so running dispatches are not garbage collected
+        self._tasks: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, group: str, item: Any) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        pending = self._pending.setdefault(group, [])
+        pending.append((item, future))
+
+        if len(pending) >= self.max_batch_size:
+            self._flush(group)
+        elif group not in self._timers:
+            self._timers[group] = asyncio.get_running_loop().call_later(
+                self.max_wait, self._flush, group
+            )
+        return await future
+
+    def _flush(self, group: str):
+        timer = self._timers.pop(group, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(group, [])
+        if batch:
+            task = asyncio.create_task(self._run(group, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, group: str, batch: List[Tuple[Any, asyncio.Future]]):
+        self.batches += 1
+        self.items += len(batch)
+        if self.name:
+            BATCH_SIZE.observe(len(batch), batcher=self.name)
+        try:
+            results = await self.dispatch(group, [item for item, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"Batch returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            results = [e] * len(batch)
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0
+        }
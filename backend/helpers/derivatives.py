@@ -0,0 +1,120 @@
+import asyncio
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+from fastapi.concurrency import run_in_threadpool
+
+from helpers.logs import get_logger
+from helpers.stickmap import build_derivatives
+
+logger = get_logger("derivatives")
+
+
+def derivative_prefix(user_id: str, s3_key: str) -> str:
+    stem = os.path.splitext(os.path.basename(s3_key))[0]
+    return f"derivatives/{user_id}/{stem}/"
+
+
+class DerivativePipeline:
+    """
+    Build thumbnails and poster frames for stored media.
+
+    The original is downloaded to a temp file, rendered in a process pool
+    (PIL/OpenCV work would otherwise block the event loop and hold the GIL),
+    and each rendition is written under `derivatives/{user_id}/{stem}/`.
+    The resulting keys are saved on the DynamoDB item as a `derivatives` map,
+    after which `on_update` is awaited with the user id.
+    """
+
+    FILENAMES = {"thumb_webp": "thumb.webp", "thumb_jpeg": "thumb.jpg", "poster": "poster.jpg"}
+
+    def __init__(
+        self,
+        s3_client,
+        table,
+        bucket: str,
+        max_workers: int = 2,
+        thumbnail_size: int = 256,
+        poster_size: int = 1280,
+        on_update: Optional[Callable[[str], Awaitable[None]]] = None
+    ):
+        self.s3_client = s3_client
+        self.table = table
+        self.bucket = bucket
+        self.max_workers = max_workers
+        self.thumbnail_size = thumbnail_size
+        self.poster_size = poster_size
+        self.on_update = on_update
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: forking a process that already runs boto3 threads is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def process(self, user_id: str, creation_id: str, s3_key: str, content_type: str) -> Dict[str, str]:
+        """Render, store and record derivatives for one object."""
+        suffix = os.path.splitext(s3_key)[1]
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        os.close(fd)
+        try:
+            await run_in_threadpool(self.s3_client.download_file, self.bucket, s3_key, path)
+            rendered = await asyncio.get_running_loop().run_in_executor(
+                self._get_executor(),
+                build_derivatives,
+                path,
+                content_type,
+                self.thumbnail_size,
+                self.poster_size
+            )
+        finally:
+            os.unlink(path)
+
+        prefix = derivative_prefix(user_id, s3_key)
+        keys = {}
+        for name, (data, derivative_type) in rendered.items():
+            key = prefix + self.FILENAMES.get(name, name)
+            await run_in_threadpool(
+                self.s3_client.put_object,
+                Bucket=self.bucket,
+                Key=key,
+                Body=data,
+                ContentType=derivative_type,
+                CacheControl="public, max-age=31536000, immutable"
+            )
+            keys[name] = key
+
+        await run_in_threadpool(
+            self.table.update_item,
+            Key={"user_id": user_id, "creation_id": creation_id},
+            UpdateExpression="SET derivatives = :d",
+            ExpressionAttributeValues={":d": keys}
+        )
+        if self.on_update is not None:
+            await self.on_update(user_id)
+        return keys
+
+    def schedule(self, user_id: str, creation_id: str, s3_key: str, content_type: str):
+        """Run `process` in the background; failures are logged, not raised."""
+        async def run():
+            try:
+                await self.process(user_id, creation_id, s3_key, content_type)
+            except Exception as e:
+                logger.warning("Derivatives failed", extra={"s3_key": s3_key, "error": str(e)})
+
+        task = asyncio.create_task(run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
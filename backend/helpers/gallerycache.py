@@ -0,0 +1,133 @@
+import json
+import time
+from typing import Any, Dict, NamedTuple, Optional
+
+from cachetools import LRUCache, TTLCache
+
+from helpers.logs import get_logger
+from helpers.metrics import CACHE_REQUESTS
+
+logger = get_logger("gallerycache")
+
+
+def _entry_size(value: Dict[str, Any]) -> int:
+    # Page text plus a flat allowance for the key and validators
+    return len(value.get("page") or "") + 256
+
+
+class Generation(NamedTuple):
+    token: str
+    # Epoch seconds of the last invalidation; None when never recorded
+    updated_at: Optional[float]
+
+
+class GalleryCache:
+    """
+    Per-user cache of gallery responses.
+
+    Every user has a generation token; entries are stored under
+    (user, generation, variant) and a write only has to move the token
+    forward for all of the user's cached pages to become unreachable. A
+    reader takes the token before querying DynamoDB and stores its result
+    under that token, so a write that lands mid-query can never be masked.
+    The time of the last invalidation travels with the token, so pages whose
+    items changed in place (a finished derivative render) get a later
+    Last-Modified even though their newest item is the same.
+
+    Entries hold the serialized page under "page" (or None for validators
+    only) and are kept in an in-process TTL/LRU bounded by `max_bytes` of
+    page text. With `redis_url` set, tokens and pages are shared through
+    Redis so a write on one worker invalidates the others; generation-keyed
+    pages are immutable and are still kept in the local tier as well.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl: int = 30,
+        redis_url: Optional[str] = None
+    ):
+        self.ttl = ttl
+        self._local = TTLCache(maxsize=max_bytes, ttl=ttl, getsizeof=_entry_size)
+        self._generations = LRUCache(maxsize=max_entries)
+        self._redis = None
+        if redis_url:
+            import redis.asyncio as redis
+            self._redis = redis.from_url(redis_url)
+
+    async def generation(self, user_id: str) -> Optional[Generation]:
+        """Current token for a user, or None when Redis is unreachable."""
+        if self._redis is None:
+            token = self._generations.get(user_id)
+            if token is None:
+                # Time-based start so an evicted counter never repeats an old token
+                token = self._generations[user_id] = time.time_ns()
+            # The token is the time it was first seen or last advanced, which
+            # is never earlier than the last write this worker knows of
+            return Generation(str(token), token / 1e9)
+
+        key, updated_key = self._redis_key(user_id, "generation"), self._redis_key(user_id, "updated")
+        try:
+            token, updated_at = await self._redis.mget(key, updated_key)
+            if token is None:
+                await self._redis.set(key, time.time_ns(), nx=True)
+                token, updated_at = await self._redis.mget(key, updated_key)
+        except Exception as e:
+            logger.warning("Gallery cache unavailable", extra={"user_id": user_id, "error": str(e)})
+            return None
+        return Generation(token.decode("utf-8"), float(updated_at) if updated_at else None)
+
+    async def get(self, user_id: str, generation: str, variant: str) -> Optional[Dict[str, Any]]:
+        key = (user_id, generation, variant)
+        value = self._local.get(key)
+        if value is None and self._redis is not None:
+            try:
+                raw = await self._redis.get(self._redis_key(user_id, "page", generation, variant))
+            except Exception as e:
+                logger.warning("Gallery cache read failed", extra={"user_id": user_id, "error": str(e)})
+                raw = None
+            if raw:
+                value = json.loads(raw)
+                self._store_local(key, value)
+        CACHE_REQUESTS.inc(cache="gallery", result="miss" if value is None else "hit")
+        return value
+
+    async def put(self, user_id: str, generation: str, variant: str, value: Dict[str, Any]):
+        self._store_local((user_id, generation, variant), value)
+        if self._redis is not None:
+            try:
+                await self._redis.set(
+                    self._redis_key(user_id, "page", generation, variant),
+                    json.dumps(value),
+                    ex=self.ttl
+                )
+            except Exception as e:
+                logger.warning("Gallery cache write failed", extra={"user_id": user_id, "error": str(e)})
+
+    async def invalidate(self, user_id: str):
+        """Drop every cached page for a user by advancing its token."""
+        if self._redis is None:
+            self._generations[user_id] = max(int((await self.generation(user_id)).token) + 1, time.time_ns())
+            return
+        try:
+            if await self.generation(user_id) is not None:
+                # One transaction, so a reader seeing the new token sees its time
+                async with self._redis.pipeline() as pipe:
+                    pipe.set(self._redis_key(user_id, "updated"), time.time())
+                    pipe.incr(self._redis_key(user_id, "generation"))
+                    await pipe.execute()
+        except Exception as e:
+            logger.error("Gallery cache invalidation failed", extra={"user_id": user_id, "error": str(e)})
+
+    def _store_local(self, key: tuple, value: Dict[str, Any]):
+        # A page bigger than the whole budget would only evict everything else
+        if _entry_size(value) <= self._local.maxsize:
+            self._local[key] = value
+
+    async def close(self):
+        if self._redis is not None:
+            await self._redis.aclose()
+
+    def _redis_key(self, user_id: str, *parts: str) -> str:
+        return ":".join(("stickgen:gallery", user_id) + parts)
@@ -0,0 +1,124 @@
+import json
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from botocore.exceptions import ClientError
+from cachetools import TTLCache
+from fastapi.concurrency import run_in_threadpool
+
+from helpers.logs import get_logger
+from helpers.metrics import CACHE_REQUESTS
+
+logger = get_logger("gencache")
+
+
+class GenerationCache:
+    """
+    Two-tier cache from a generation payload hash to a stored image.
+
+    Entries map the hash to the S3 key of an existing `generations/...`
+    object plus the metadata returned for it, so a hit never touches the
+    inference endpoint. The first tier is an in-process TTL/LRU. The shared
+    tier is Redis when `redis_url` is set, otherwise a small index object per
+    hash under `prefix` in the bucket (pair it with an S3 lifecycle rule on
+    that prefix to bound its size).
+    """
+
+    def __init__(
+        self,
+        s3_client,
+        bucket: str,
+        max_entries: int = 1024,
+        ttl: int = 86400,
+        redis_url: Optional[str] = None,
+        prefix: str = "cache/generations/"
+    ):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.ttl = ttl
+        self.prefix = prefix
+        self._local = TTLCache(maxsize=max_entries, ttl=ttl)
+        self._redis = None
+        if redis_url:
+            import redis.asyncio as redis
+            self._redis = redis.from_url(redis_url)
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._local.get(key)
+        if entry is None:
+            entry = await self._shared_get(key)
+            if entry is not None:
+                self._local[key] = entry
+        if entry is None:
+            self.misses += 1
+            CACHE_REQUESTS.inc(cache="generation", result="miss")
+        else:
+            self.hits += 1
+            CACHE_REQUESTS.inc(cache="generation", result="hit")
+        return entry
+
+    async def put(self, key: str, s3_key: str, metadata: Dict[str, Any]):
+        entry = {"s3_key": s3_key, "metadata": metadata}
+        self._local[key] = entry
+        try:
+            await self._shared_put(key, entry)
+        except Exception as e:
+            # The local tier still serves this worker
+            logger.warning("Generation cache write failed", extra={"cache_key": key, "error": str(e)})
+
+    async def invalidate(self, key: str):
+        self._local.pop(key, None)
+        try:
+            if self._redis is not None:
+                await self._redis.delete(self._redis_key(key))
+            else:
+                await run_in_threadpool(self.s3_client.delete_object, Bucket=self.bucket, Key=self.prefix + key)
+        except Exception as e:
+            # The shared entry expires with its TTL
+            logger.error("Generation cache invalidation failed", extra={"cache_key": key, "error": str(e)})
+
+    async def close(self):
+        if self._redis is not None:
+            await self._redis.aclose()
+
+    async def _shared_get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            if self._redis is not None:
+                raw = await self._redis.get(self._redis_key(key))
+                return json.loads(raw) if raw else None
+
+            response = await run_in_threadpool(
+                self.s3_client.get_object,
+                Bucket=self.bucket,
+                Key=self.prefix + key
+            )
+            age = (datetime.now(timezone.utc) - response['LastModified']).total_seconds()
+            if age > self.ttl:
+                return None
+            return json.loads(response['Body'].read())
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') not in ('NoSuchKey', '404'):
+                logger.warning("Generation cache read failed", extra={"cache_key": key, "error": str(e)})
+            return None
+        except Exception as e:
+            # Redis down, S3 unreachable, a corrupt entry: generate instead
+            logger.warning("Generation cache read failed", extra={"cache_key": key, "error": str(e)})
+            return None
+
+    async def _shared_put(self, key: str, entry: Dict[str, Any]):
+        body = json.dumps(entry)
+        if self._redis is not None:
+            await self._redis.set(self._redis_key(key), body, ex=self.ttl)
+        else:
+            await run_in_threadpool(
+                self.s3_client.put_object,
+                Bucket=self.bucket,
+                Key=self.prefix + key,
+                Body=body.encode('utf-8'),
+                ContentType="application/json"
+            )
+
+    def _redis_key(self, key: str) -> str:
+        return f"stickgen:gencache:{key}"
@@ -0,0 +1,147 @@
+import asyncio
+import json
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from cachetools import TTLCache
+
+from helpers.logs import get_logger
+
+logger = get_logger("jobs")
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+TERMINAL_STATUSES = (SUCCEEDED, FAILED)
+
+
+class JobQueue:
+    """
+    Background job queue with a fixed-size worker pool.
+
+    Jobs live in process memory by default. When `redis_url` is set the
+    queue and job records are kept in Redis instead, so any worker process
+    can pick up a job and any API replica can report its status.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+        concurrency: int = 2,
+        redis_url: Optional[str] = None,
+        job_ttl: int = 3600,
+        name: str = "jobs"
+    ):
+        self.handler = handler
+        self.concurrency = max(1, concurrency)
+        self.job_ttl = job_ttl
+        self.name = name
+        self._workers: List[asyncio.Task] = []
+        self._redis = None
+        self._redis_url = redis_url
+        # Local backend state, unused when Redis is configured
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._records = TTLCache(maxsize=100_000, ttl=job_ttl)
+        self._payloads: Dict[str, Dict[str, Any]] = {}
+
+    async def start(self):
+        if self._redis_url and self._redis is None:
+            import redis.asyncio as redis
+            self._redis = redis.from_url(self._redis_url)
+        for i in range(self.concurrency):
+            self._workers.append(asyncio.create_task(self._worker(i)))
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+    async def submit(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Enqueue a job and return its initial record."""
+        now = _now()
+        record = {
+            "job_id": str(uuid.uuid4()),
+            "status": QUEUED,
+            "created_at": now,
+            "updated_at": now,
+            "result": None,
+            "error": None
+        }
+        await self._save(record)
+        await self._push(record["job_id"], payload)
+        return record
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        if self._redis is not None:
+            raw = await self._redis.get(self._record_key(job_id))
+            return json.loads(raw) if raw else None
+        return self._records.get(job_id)
+
+    async def _worker(self, index: int):
+        while True:
+            job_id, payload = await self._pop()
+            record = await self.get(job_id)
+            if record is None or payload is None:
+                # Expired before a worker got to it
+                continue
+
+            await self._update(record, status=RUNNING)
+            try:
+                result = await self.handler(payload)
+                await self._update(record, status=SUCCEEDED, result=result)
+            except asyncio.CancelledError:
+                await self._update(record, status=FAILED, error="Worker shut down")
+                raise
+            except Exception as e:
+                error = getattr(e, "detail", None) or str(e)
+                logger.warning("Job failed", extra={"job_id": job_id, "worker": index, "error": error})
+                await self._update(record, status=FAILED, error=error)
+
+    async def _update(self, record: Dict[str, Any], **changes):
+        record.update(changes, updated_at=_now())
+        await self._save(record)
+
+    async def _save(self, record: Dict[str, Any]):
+        if self._redis is not None:
+            await self._redis.set(self._record_key(record["job_id"]), json.dumps(record), ex=self.job_ttl)
+        else:
+            self._records[record["job_id"]] = record
+
+    async def _push(self, job_id: str, payload: Dict[str, Any]):
+        if self._redis is not None:
+            await self._redis.set(self._payload_key(job_id), json.dumps(payload), ex=self.job_ttl)
+            await self._redis.rpush(self._queue_key(), job_id)
+        else:
+            self._payloads[job_id] = payload
+            await self._queue.put(job_id)
+
+    async def _pop(self) -> Tuple[str, Optional[Dict[str, Any]]]:
+        if self._redis is not None:
+            while True:
+                item = await self._redis.blpop([self._queue_key()], timeout=1)
+                if item is None:
+                    continue
+                job_id = item[1].decode("utf-8")
+                raw = await self._redis.getdel(self._payload_key(job_id))
+                return job_id, json.loads(raw) if raw else None
+        job_id = await self._queue.get()
+        return job_id, self._payloads.pop(job_id, None)
+
+    def _queue_key(self) -> str:
+        return f"stickgen:{self.name}:queue"
+
+    def _record_key(self, job_id: str) -> str:
+        return f"stickgen:{self.name}:{job_id}"
+
+    def _payload_key(self, job_id: str) -> str:
+        return f"stickgen:{self.name}:{job_id}:payload"
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
@@ -0,0 +1,334 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds; covers fast DynamoDB reads through slow SDXL generations
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+# Bytes, 1 KiB to 512 MiB in powers of four
+SIZE_BUCKETS = tuple(1024 * 4 ** i for i in range(10))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+
+class _Metric:
+    kind = ""
+    # Appended to the name of the exposed series
+    suffix = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        name = self.name + self.suffix
+        return [f"# HELP {name} {self.documentation}", f"# TYPE {name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+    # As prometheus_client: HELP/TYPE name the _total series, not the family
+    suffix = "_total"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{self.suffix}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    @contextmanager
+    def track(self, **labels) -> Iterator[None]:
+        """Count the wrapped block as in progress while it runs."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: non-cumulative bucket counts (+Inf last), sum
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return sum(series[0]) if series else 0
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            items = [(key, list(counts), total[0]) for key, (counts, total) in self._series.items()]
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together in Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "stickgen_http_request_duration_seconds",
+    "HTTP request latency by route template.",
+    ("method", "route", "status")
+))
+HTTP_REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "stickgen_http_requests_in_flight",
+    "HTTP requests currently being served."
+))
+HTTP_REQUEST_SIZE = REGISTRY.register(Histogram(
+    "stickgen_http_request_size_bytes",
+    "Declared request body size by route template.",
+    ("method", "route"),
+    buckets=SIZE_BUCKETS
+))
+HTTP_RESPONSE_SIZE = REGISTRY.register(Histogram(
+    "stickgen_http_response_size_bytes",
+    "Response body size by route template.",
+    ("method", "route"),
+    buckets=SIZE_BUCKETS
+))
+DOWNSTREAM_DURATION = REGISTRY.register(Histogram(
+    "stickgen_downstream_duration_seconds",
+    "Latency of calls to S3, DynamoDB and the SDXL endpoint.",
+    ("service", "operation", "outcome")
+))
+GENERATIONS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "stickgen_generations_in_flight",
+    "Image generations currently running, by entry point.",
+    ("source",)
+))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    "stickgen_cache_requests",
+    "Cache lookups by cache and result.",
+    ("cache", "result")
+))
+SINGLE_FLIGHT_CALLS = REGISTRY.register(Counter(
+    "stickgen_single_flight_calls",
+    "Calls through a single-flight group, led or coalesced onto an in-flight call.",
+    ("flight", "result")
+))
+BATCH_SIZE = REGISTRY.register(Histogram(
+    "stickgen_batch_size",
+    "Items per dispatched micro-batch.",
+    ("batcher",),
+    buckets=(1, 2, 3, 4, 6, 8, 12, 16, 24, 32)
+))
+PAYLOAD_SIZE = REGISTRY.register(Histogram(
+    "stickgen_payload_size_bytes",
+    "Size of media moved through the service.",
+    ("kind",),
+    buckets=SIZE_BUCKETS
+))
+
+
+@contextmanager
+def timed(service: str, operation: str) -> Iterator[None]:
+    """Record the wrapped downstream call in DOWNSTREAM_DURATION."""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        DOWNSTREAM_DURATION.observe(time.perf_counter() - start, service=service, operation=operation, outcome=outcome)
+
+
+def instrument_boto_client(client, service: str):
+    """
+    Time every API call made through a boto3 client.
+
+    Uses botocore's before-call/after-call events, so calls made from any
+    helper sharing the client are covered without wrapping call sites.
+    """
+    events = client.meta.events
+
+    def before_call(context, **kwargs):
+        context["stickgen_start"] = time.perf_counter()
+
+    def after_call(event_name, context, http_response=None, **kwargs):
+        # after-call-error (connection failures) carries no response
+        start = context.pop("stickgen_start", None)
+        if start is None:
+            return
+        failed = http_response is None or http_response.status_code >= 300
+        DOWNSTREAM_DURATION.observe(
+            time.perf_counter() - start,
+            service=service,
+            operation=event_name.rsplit(".", 1)[-1],
+            outcome="error" if failed else "ok"
+        )
+
+    events.register("before-call.*.*", before_call, unique_id="stickgen-metrics-before")
+    events.register("after-call.*.*", after_call, unique_id="stickgen-metrics-after")
+    events.register("after-call-error.*.*", after_call, unique_id="stickgen-metrics-error")
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency, in-flight count and body sizes.
+
+    Routes are labelled with their template (`/gallery/{user_id}`), never
+    the raw path, so series count stays bounded. Plain ASGI rather than
+    BaseHTTPMiddleware keeps the per-request cost to a few dict lookups and
+    leaves streaming responses untouched.
+    """
+
+    def __init__(self, app, skip_paths: Sequence[str] = ("/metrics",)):
+        self.app = app
+        self.skip_paths = set(skip_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+        sent = 0
+
+        async def send_wrapper(message):
+            nonlocal status, sent
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            method = scope["method"]
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - start, method=method, route=route, status=str(status))
+            HTTP_RESPONSE_SIZE.observe(sent, method=method, route=route)
+            for name, value in scope.get("headers", ()):
+                if name == b"content-length" and value.isdigit():
+                    HTTP_REQUEST_SIZE.observe(int(value), method=method, route=route)
+                    break
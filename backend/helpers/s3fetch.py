@@ -0,0 +1,78 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+
+@dataclass
+class FetchResult:
+    key: str
+    body: Optional[bytes] = None
+    content_type: Optional[str] = None
+    error: Optional[str] = None
+
+
+class S3FetchEngine:
+    """
+    Bounded-concurrency S3 reader shared by every endpoint.
+
+    boto3 clients are thread-safe but blocking, so each GET runs on a
+    dedicated thread pool instead of the event loop. The pool size caps the
+    process-wide number of S3 calls, while `concurrency` caps a single request
+    so one large gallery cannot starve the others.
+    """
+
+    def __init__(self, s3_client, max_workers: int = 32):
+        self.s3_client = s3_client
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="s3fetch"
+        )
+
+    def _get_object(self, bucket: str, key: str) -> FetchResult:
+        response = self.s3_client.get_object(Bucket=bucket, Key=key)
+        return FetchResult(
+            key=key,
+            body=response['Body'].read(),
+            content_type=response.get('ContentType')
+        )
+
+    async def fetch_many(
+        self,
+        bucket: str,
+        keys: Sequence[str],
+        concurrency: int = 8,
+        timeout: Optional[float] = None
+    ) -> List[FetchResult]:
+        """
+        Fetch several objects concurrently.
+
+        Args:
+            bucket: S3 bucket name
+            keys: Object keys to read
+            concurrency: Maximum number of GETs in flight for this call
+            timeout: Per-object timeout in seconds, or None to wait forever
+
+        Returns:
+            One FetchResult per key, in the same order as `keys`. Failed or
+            timed out objects carry an `error` message instead of a body.
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def fetch_one(key: str) -> FetchResult:
+            async with semaphore:
+                try:
+                    return await asyncio.wait_for(
+                        loop.run_in_executor(self._executor, self._get_object, bucket, key),
+                        timeout=timeout
+                    )
+                except asyncio.TimeoutError:
+                    return FetchResult(key=key, error=f"Timed out after {timeout}s")
+                except Exception as e:
+                    return FetchResult(key=key, error=str(e))
+
+        return await asyncio.gather(*(fetch_one(key) for key in keys))
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
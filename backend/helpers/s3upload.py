@@ -0,0 +1,96 @@
+from typing import Dict, Optional
+
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+
+# S3 rejects multipart parts below 5 MiB, except for the last one
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+async def stream_to_s3(
+    s3_client,
+    bucket: str,
+    key: str,
+    file: UploadFile,
+    content_type: str,
+    metadata: Optional[Dict[str, str]] = None,
+    chunk_size: int = 8 * 1024 * 1024,
+    max_size: Optional[int] = None
+) -> int:
+    """
+    Copy an uploaded file to S3 in fixed-size chunks.
+
+    At most two chunks (the part being sent and the read-ahead that tells
+    whether it is the last) are held in memory. Files that fit in one chunk
+    go up with one put_object; anything larger uses a multipart upload,
+    which is aborted if the copy fails or the file exceeds `max_size`.
+
+    Returns:
+        Number of bytes written
+    """
+    chunk_size = max(chunk_size, MIN_PART_SIZE)
+    metadata = metadata or {}
+
+    chunk = await file.read(chunk_size)
+    if max_size is not None and len(chunk) > max_size:
+        raise UploadTooLarge(f"File exceeds the {max_size} byte limit")
+
+    next_chunk = await file.read(chunk_size) if len(chunk) == chunk_size else b""
+    if not next_chunk:
+        await run_in_threadpool(
+            s3_client.put_object,
+            Bucket=bucket,
+            Key=key,
+            Body=chunk,
+            ContentType=content_type,
+            Metadata=metadata
+        )
+        return len(chunk)
+
+    upload = await run_in_threadpool(
+        s3_client.create_multipart_upload,
+        Bucket=bucket,
+        Key=key,
+        ContentType=content_type,
+        Metadata=metadata
+    )
+    upload_id = upload['UploadId']
+    parts = []
+    total = 0
+    try:
+        while chunk:
+            total += len(chunk)
+            if max_size is not None and total > max_size:
+                raise UploadTooLarge(f"File exceeds the {max_size} byte limit")
+
+            part = await run_in_threadpool(
+                s3_client.upload_part,
+                Bucket=bucket,
+                Key=key,
+                UploadId=upload_id,
+                PartNumber=len(parts) + 1,
+                Body=chunk
+            )
+            parts.append({'ETag': part['ETag'], 'PartNumber': len(parts) + 1})
+            chunk, next_chunk = next_chunk, (await file.read(chunk_size) if next_chunk else b"")
+
+        await run_in_threadpool(
+            s3_client.complete_multipart_upload,
+            Bucket=bucket,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={'Parts': parts}
+        )
+        return total
+    except BaseException:
+        await run_in_threadpool(
+            s3_client.abort_multipart_upload,
+            Bucket=bucket,
+            Key=key,
+            UploadId=upload_id
+        )
+        raise
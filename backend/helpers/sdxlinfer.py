@@ -1,81 +1,191 @@
-import requests
+import httpx
 import json
 import base64
-from typing import Dict, Any, Optional
+import hashlib
+import orjson
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional
+from config import get_settings
+from helpers.batcher import MicroBatcher
+from helpers.metrics import REGISTRY, Gauge, PAYLOAD_SIZE, timed
+from helpers.logs import get_logger
 
-async def generate_styled_image(prompt: str, style: str) -> Dict[str, Any]:
+settings = get_settings()
+logger = get_logger("sdxl")
+
+SDXL_IN_FLIGHT = REGISTRY.register(Gauge(
+    "stickgen_sdxl_requests_in_flight",
+    "HTTP requests currently outstanding against the SDXL endpoint."
+))
+
+# Pooled client reused across requests so the endpoint connection stays warm
+_client: Optional[httpx.AsyncClient] = None
+
+def get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.sdxl_timeout, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=settings.sdxl_max_connections,
+                max_keepalive_connections=settings.sdxl_max_connections
+            )
+        )
+    return _client
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+@dataclass
+class GenerationResult:
     """
-    Generate an image using SDXL with style-specific prompts.
-    
-    Args:
-        prompt: Base prompt describing the image
-        style: Style identifier ('anime', 'cartoon', 'realistic')
-        
-    Returns:
-        Dictionary containing generated image and metadata
+    Outcome of one SDXL call.
+
+    `image` holds the PNG bytes exactly as received from the endpoint, so
+    they can go to S3 without another encode/decode pass.
+    """
+    status: str
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    image: Optional[bytes] = None
+    content_type: str = "image/png"
+    error: Optional[str] = None
+
+# Style-specific prompt modifiers
+STYLE_PROMPTS = {
+    'anime': "anime style, Studio Ghibli, cel shaded, vibrant colors",
+    'cartoon': "cartoon style, Disney/Pixar, clean lines, bold colors",
+    'realistic': "photorealistic, detailed, high resolution, professional photography",
+}
+
+# Negative prompts to improve quality
+NEGATIVE_PROMPT = "blurry, low quality, distorted, bad anatomy, watermark, signature, text"
+
+def build_payload(prompt: str, style: str) -> Dict[str, Any]:
+    """
+    Build the SDXL request body for a prompt and style.
+
+    The payload is fully determined by its inputs, which makes it usable as
+    a cache key for identical generations.
     """
-    # Style-specific prompt modifiers
-    style_prompts = {
-        'anime': "anime style, Studio Ghibli, cel shaded, vibrant colors",
-        'cartoon': "cartoon style, Disney/Pixar, clean lines, bold colors",
-        'realistic': "photorealistic, detailed, high resolution, professional photography",
-    }
-    
     # Get style prompt or default to realistic
-    style_modifier = style_prompts.get(style, style_prompts['realistic'])
+    style_modifier = STYLE_PROMPTS.get(style, STYLE_PROMPTS['realistic'])
     
     # Combine base prompt with style
     full_prompt = f"{prompt}, {style_modifier}, high quality, detailed"
     
-    # Negative prompts to improve quality
-    negative_prompt = "blurry, low quality, distorted, bad anatomy, watermark, signature, text"
-    
-    try:
-        # Call SageMaker endpoint
-        API_URL = "https://runtime.sagemaker.us-east-1:891612544795:endpoint/jumpstart-dft-stabilityai-sdxl-1-0-20241207-064752"
-        
-        payload = {
-            "inputs": full_prompt,
-            "parameters": {
-                "negative_prompt": negative_prompt,
-                "num_inference_steps": 30,
-                "guidance_scale": 7.5,
-                "width": 1024,
-                "height": 1024
-            }
+    return {
+        "inputs": full_prompt,
+        "parameters": {
+            "negative_prompt": NEGATIVE_PROMPT,
+            "num_inference_steps": 30,
+            "guidance_scale": 7.5,
+            "width": 1024,
+            "height": 1024
         }
-        
-        response = requests.post(
-            API_URL,
-            json=payload,
+    }
+
+def payload_key(payload: Dict[str, Any]) -> str:
+    """Content hash of a generation payload."""
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+async def _post_single(payload: Dict[str, Any]) -> bytes:
+    with SDXL_IN_FLIGHT.track(), timed("sdxl", "invoke"):
+        response = await get_client().post(
+            settings.sdxl_endpoint_url,
+            content=orjson.dumps(payload),
             headers={
                 "Content-Type": "application/json"
             }
         )
         response.raise_for_status()
+    PAYLOAD_SIZE.observe(len(response.content), kind="sdxl_response")
+    return response.content
+
+async def _post_batch(group: str, payloads: List[Dict[str, Any]]) -> List[bytes]:
+    """
+    Send several payloads that share parameters as one request.
+
+    The batch body carries a list of prompts under "inputs"; the endpoint
+    answers with {"images": [<base64 PNG>, ...]} in the same order.
+    """
+    if len(payloads) == 1:
+        return [await _post_single(payloads[0])]
+
+    with SDXL_IN_FLIGHT.track(), timed("sdxl", "invoke_batch"):
+        response = await get_client().post(
+            settings.sdxl_batch_endpoint_url or settings.sdxl_endpoint_url,
+            content=orjson.dumps({
+                "inputs": [payload["inputs"] for payload in payloads],
+                "parameters": payloads[0]["parameters"]
+            }),
+            headers={
+                "Content-Type": "application/json"
+            }
+        )
+        response.raise_for_status()
+    PAYLOAD_SIZE.observe(len(response.content), kind="sdxl_response")
+    return [base64.b64decode(image) for image in orjson.loads(response.content)["images"]]
+
+# Micro-batching stage in front of the endpoint, off unless configured
+_batcher: Optional[MicroBatcher] = None
+if settings.sdxl_batch_enabled:
+    _batcher = MicroBatcher(
+        _post_batch,
+        max_batch_size=settings.sdxl_batch_max_size,
+        max_wait_ms=settings.sdxl_batch_max_wait_ms,
+        name="sdxl"
+    )
+
+def batch_stats() -> Optional[Dict[str, Any]]:
+    return None if _batcher is None else _batcher.stats()
+
+async def _infer(payload: Dict[str, Any]) -> bytes:
+    if _batcher is None:
+        return await _post_single(payload)
+    # Only payloads with identical parameters can share a batch
+    group = json.dumps(payload["parameters"], sort_keys=True)
+    return await _batcher.submit(group, payload)
+
+async def generate_styled_image(prompt: str, style: str) -> GenerationResult:
+    """
+    Generate an image using SDXL with style-specific prompts.
+    
+    Args:
+        prompt: Base prompt describing the image
+        style: Style identifier ('anime', 'cartoon', 'realistic')
         
-        # Process response
-        image_bytes = response.content
-        base64_image = base64.b64encode(image_bytes).decode('utf-8')
+    Returns:
+        GenerationResult with the raw PNG bytes and metadata
+    """
+    payload = build_payload(prompt, style)
+    full_prompt = payload["inputs"]
+    
+    try:
+        # Call SageMaker endpoint, batched with concurrent requests if enabled
+        image_bytes = await _infer(payload)
         
-        return {
-            "status": "success",
-            "image": base64_image,
-            "metadata": {
+        return GenerationResult(
+            status="success",
+            image=image_bytes,
+            metadata={
                 "prompt": full_prompt,
-                "negative_prompt": negative_prompt,
+                "negative_prompt": NEGATIVE_PROMPT,
                 "style": style,
                 "original_prompt": prompt
             }
-        }
+        )
         
     except Exception as e:
-        print(f"Error generating image: {str(e)}")
-        return {
-            "status": "error",
-            "error": str(e),
-            "metadata": {
+        logger.warning("SDXL inference failed", extra={"style": style, "error": str(e)})
+        return GenerationResult(
+            status="error",
+            error=str(e),
+            metadata={
                 "prompt": full_prompt,
                 "style": style
             }
-        }
+        )
@@ -0,0 +1,140 @@
+import re
+from typing import Dict, List, Optional, Set
+
+from cachetools import TTLCache
+from fastapi.concurrency import run_in_threadpool
+
+from helpers.logs import get_logger
+from helpers.metrics import CACHE_REQUESTS
+from helpers.singleflight import SingleFlight
+
+logger = get_logger("searchindex")
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: Optional[str]) -> Set[str]:
+    """Lower-cased alphanumeric words of a prompt or query."""
+    return set(TOKEN_PATTERN.findall(text.lower())) if text else set()
+
+
+class _UserIndex:
+    def __init__(self):
+        # creation_id -> style, so style and date filters never touch DynamoDB
+        self.docs: Dict[str, Optional[str]] = {}
+        self.postings: Dict[str, Set[str]] = {}
+
+    def add(self, creation_id: str, prompt: Optional[str], style: Optional[str]):
+        self.docs[creation_id] = style
+        for token in tokenize(prompt):
+            self.postings.setdefault(token, set()).add(creation_id)
+
+
+class PromptIndex:
+    """
+    In-process inverted index from prompt tokens to a user's creation ids.
+
+    A user's index is built on their first keyword search from one
+    projected query over their partition, then kept current by `add` on
+    every upload and generation this process records. Searches after that
+    cost a set intersection plus the page being returned. Indexes expire
+    after `ttl` seconds so writes made by other workers show up within that
+    window, and the least recently used users are dropped past `max_users`.
+    """
+
+    def __init__(self, table, max_users: int = 256, ttl: int = 300):
+        self.table = table
+        self._indexes = TTLCache(maxsize=max_users, ttl=ttl)
+        self._builds = SingleFlight("search_index")
+        # Writes that land while a user's index is being built
+        self._pending: Dict[str, List[tuple]] = {}
+
+    def add(self, user_id: str, creation_id: str, prompt: Optional[str], style: Optional[str]):
+        """Index a newly written item; no-op for users without a loaded index."""
+        index = self._indexes.get(user_id)
+        if index is not None:
+            index.add(creation_id, prompt, style)
+        elif user_id in self._pending:
+            self._pending[user_id].append((creation_id, prompt, style))
+
+    async def search(
+        self,
+        user_id: str,
+        query: str,
+        style: Optional[str] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None
+    ) -> List[str]:
+        """
+        Creation ids whose prompt contains every word of `query`, newest first.
+
+        Args:
+            user_id: Owner of the items.
+            query: Free text; matched word by word, case-insensitively.
+            style: Only items with this style.
+            start: Inclusive lower bound on creation_id.
+            end: Inclusive upper bound on creation_id.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        index = await self._get(user_id)
+
+        # Intersect from the rarest token so the working set stays small
+        postings = sorted((index.postings.get(token, set()) for token in tokens), key=len)
+        matches = set(postings[0])
+        for posting in postings[1:]:
+            matches &= posting
+            if not matches:
+                return []
+
+        return sorted(
+            (
+                creation_id for creation_id in matches
+                if (style is None or index.docs.get(creation_id) == style)
+                and (start is None or creation_id >= start)
+                and (end is None or creation_id <= end)
+            ),
+            reverse=True
+        )
+
+    async def _get(self, user_id: str) -> _UserIndex:
+        index = self._indexes.get(user_id)
+        if index is not None:
+            CACHE_REQUESTS.inc(cache="search_index", result="hit")
+            return index
+        CACHE_REQUESTS.inc(cache="search_index", result="miss")
+        index, _ = await self._builds.do(user_id, lambda: self._build(user_id))
+        return index
+
+    async def _build(self, user_id: str) -> _UserIndex:
+        self._pending[user_id] = []
+        try:
+            index = _UserIndex()
+            for item in await run_in_threadpool(self._load, user_id):
+                index.add(item["creation_id"], item.get("prompt"), item.get("style"))
+            for creation_id, prompt, style in self._pending[user_id]:
+                index.add(creation_id, prompt, style)
+            self._indexes[user_id] = index
+        finally:
+            del self._pending[user_id]
+        logger.info("Search index built", extra={
+            "user_id": user_id, "items": len(index.docs), "tokens": len(index.postings)
+        })
+        return index
+
+    def _load(self, user_id: str) -> List[dict]:
+        # Only the indexed attributes; filenames, derivatives etc. stay in DynamoDB
+        query_kwargs = {
+            'KeyConditionExpression': 'user_id = :uid',
+            'ExpressionAttributeValues': {':uid': user_id},
+            'ProjectionExpression': '#c, #p, #s',
+            'ExpressionAttributeNames': {'#c': 'creation_id', '#p': 'prompt', '#s': 'style'}
+        }
+        items = []
+        while True:
+            response = self.table.query(**query_kwargs)
+            items.extend(response.get('Items', []))
+            if 'LastEvaluatedKey' not in response:
+                return items
+            query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
@@ -0,0 +1,65 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from helpers.metrics import SINGLE_FLIGHT_CALLS
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls that share a key into one execution.
+
+    The first caller for a key runs `fn`; callers arriving while it is still
+    running wait for the same result instead of starting their own. With a
+    `name`, calls are counted in the stickgen_single_flight_calls metric.
+    """
+
+    def __init__(self, name: Optional[str] = None):
+        self.name = name
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Run `fn` once per key at a time.
+
+        Returns:
+            Tuple of the result and whether it was shared from another
+            caller's in-flight execution.
+        """
+        self.calls += 1
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            if self.name:
+                SINGLE_FLIGHT_CALLS.inc(flight=self.name, result="coalesced")
+            # Shield so a disconnecting follower does not cancel the leader
+            return await asyncio.shield(future), True
+
+        if self.name:
+            SINGLE_FLIGHT_CALLS.inc(flight=self.name, result="led")
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await fn()
+            future.set_result(result)
+            return result, False
+        except asyncio.CancelledError:
+            future.set_exception(RuntimeError("In-flight call was cancelled"))
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            del self._inflight[key]
+            if future.done() and not future.cancelled():
+                # Mark the exception retrieved when nobody else was waiting
+                future.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight),
+            "coalescing_ratio": self.coalesced / self.calls if self.calls else 0.0
+        }
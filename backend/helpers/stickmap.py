@@ -1,21 +1,36 @@
+from __future__ import annotations
+
 from dataclasses import dataclass
-import numpy as np
+from collections import deque
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+from typing import BinaryIO, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+from fastapi import UploadFile
+import multiprocessing
+import shutil
+import tempfile
 import io
 import base64
+from helpers.lazy import lazy_import
+from helpers.logs import get_logger
+
+logger = get_logger("stickmap")
+
+# Imaging libraries load on first use, so importing this module (and the API
+# that imports it) does not pay for them until an image is processed
+np = lazy_import("numpy")
 
 # Try importing PIL first
-try:
-    from PIL import Image
-except ImportError:
-    print("Warning: PIL not properly installed")
-    Image = None
+Image = lazy_import("PIL.Image")
+if Image is None:
+    logger.warning("PIL not properly installed")
 
 # Try importing OpenCV
-try:
-    import cv2
-except ImportError:
-    print("Warning: OpenCV not properly installed")
-    cv2 = None
+cv2 = lazy_import("cv2")
+if cv2 is None:
+    logger.warning("OpenCV not properly installed")
 
 @dataclass
 class ProcessedImage:
@@ -23,6 +38,473 @@ class ProcessedImage:
     content_type: str
     success: bool
     error: str = None
+    skeleton: Optional["StickSkeleton"] = None
+
+@dataclass
+class StickSkeleton:
+    """
+    Joints and limbs extracted from one drawing.
+
+    `joints` holds (x, y) pixel positions on the size x size working grid,
+    `kinds` marks each joint as an ENDPOINT (hand, foot, head tip) or a
+    JUNCTION (where strokes meet), and `limbs` lists pairs of joint indices
+    connected by a stroke. `scale` and `offset` map working-grid positions
+    back onto the original image: original = joints * scale - offset.
+    """
+    joints: np.ndarray
+    kinds: np.ndarray
+    limbs: np.ndarray
+    size: int
+    scale: float = 1.0
+    offset: Tuple[float, float] = (0.0, 0.0)
+
+    def joints_in_original(self) -> np.ndarray:
+        return self.joints.astype(np.float32) * self.scale - np.asarray(self.offset, dtype=np.float32)
+
+ENDPOINT = 1
+JUNCTION = 3
+
+# (dy, dx) of the 8 neighbours in Zhang-Suen order P2..P9, clockwise from north
+_NEIGHBOURS = ((-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1))
+
+@lru_cache(maxsize=None)
+def _neighbourhood_tables() -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Lookup tables indexed by the 8-bit neighbourhood code of a pixel.
+
+    Bit i of the code is neighbour P(i+2). Returns the crossing number
+    (0->1 transitions around the ring) and the Zhang-Suen deletion rule for
+    each of the two sub-iterations.
+    """
+    codes = np.arange(256)
+    p = [(codes >> i) & 1 for i in range(8)]
+    p2, p3, p4, p5, p6, p7, p8, p9 = p
+    count = sum(p)
+    ring = p + p[:1]
+    crossings = sum((ring[i] == 0) & (ring[i + 1] == 1) for i in range(8))
+    candidate = (count >= 2) & (count <= 6) & (crossings == 1)
+    first = candidate & (p2 * p4 * p6 == 0) & (p4 * p6 * p8 == 0)
+    second = candidate & (p2 * p4 * p8 == 0) & (p2 * p6 * p8 == 0)
+    return crossings.astype(np.uint8), first, second
+
+def _require_cv2():
+    if cv2 is None:
+        raise RuntimeError("OpenCV is required for stick-figure extraction")
+
+def _neighbourhood_codes(flat: np.ndarray, indices: np.ndarray, row_stride: int) -> np.ndarray:
+    """
+    8-bit neighbour codes of selected pixels.
+
+    `flat` is a zero-padded 0/1 uint8 image stack flattened to 1-D and
+    `indices` are positions in it, so work scales with the number of ink
+    pixels rather than the image area.
+    """
+    codes = np.zeros(indices.shape, dtype=np.uint8)
+    for bit, (dy, dx) in enumerate(_NEIGHBOURS):
+        codes |= flat[indices + (dy * row_stride + dx)] << bit
+    return codes
+
+def _pad_flat(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray, int]:
+    """Zero-pad the last two axes by one pixel and flatten, returning the padded view too."""
+    pad = [(0, 0)] * (mask.ndim - 2) + [(1, 1), (1, 1)]
+    padded = np.pad(mask.astype(np.uint8), pad)
+    return padded, padded.reshape(-1), padded.shape[-1]
+
+def prepare_batch(images: Union[Sequence[np.ndarray], np.ndarray], size: int = 256) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Convert images to one (B, size, size) grayscale uint8 stack.
+
+    Each image is padded to a square with its border colour before resizing
+    so the drawing keeps its aspect ratio.
+
+    Returns:
+        Tuple of the stack, per-image scales and per-image (x, y) offsets
+    """
+    _require_cv2()
+    if isinstance(images, np.ndarray) and images.ndim == 3 and images.shape[1:] == (size, size) \
+            and images.dtype == np.uint8:
+        count = images.shape[0]
+        return images, np.ones(count, dtype=np.float32), np.zeros((count, 2), dtype=np.float32)
+
+    stack = np.empty((len(images), size, size), dtype=np.uint8)
+    scales = np.empty(len(images), dtype=np.float32)
+    offsets = np.empty((len(images), 2), dtype=np.float32)
+    for i, image in enumerate(images):
+        image = np.asarray(image)
+        if image.ndim == 3:
+            code = cv2.COLOR_RGBA2GRAY if image.shape[2] == 4 else cv2.COLOR_RGB2GRAY
+            image = cv2.cvtColor(image, code)
+        if image.dtype != np.uint8:
+            image = np.clip(image, 0, 255).astype(np.uint8)
+
+        h, w = image.shape
+        side = max(h, w)
+        top, left = (side - h) // 2, (side - w) // 2
+        border = int(np.median(np.concatenate([image[0], image[-1], image[:, 0], image[:, -1]])))
+        square = cv2.copyMakeBorder(image, top, side - h - top, left, side - w - left,
+                                    cv2.BORDER_CONSTANT, value=border)
+        interpolation = cv2.INTER_AREA if side > size else cv2.INTER_LINEAR
+        stack[i] = cv2.resize(square, (size, size), interpolation=interpolation)
+        scales[i] = side / size
+        offsets[i] = (left, top)
+    return stack, scales, offsets
+
+def binarize_batch(gray: np.ndarray, min_contrast: int = 32) -> np.ndarray:
+    """
+    Otsu-threshold every image of a (B, H, W) uint8 stack at once.
+
+    Ink is whichever side of the threshold covers less of the image, so both
+    dark-on-light and light-on-dark drawings work. Images with less than
+    `min_contrast` grey levels of range are treated as blank.
+    """
+    count = gray.shape[0]
+    flat = gray.reshape(count, -1)
+    hist = np.bincount(
+        (flat + (np.arange(count, dtype=np.int64) * 256)[:, None]).ravel(),
+        minlength=count * 256
+    ).reshape(count, 256).astype(np.float64)
+
+    levels = np.arange(256, dtype=np.float64)
+    weight_low = np.cumsum(hist, axis=1)
+    weight_high = weight_low[:, -1:] - weight_low
+    sum_low = np.cumsum(hist * levels, axis=1)
+    mean_low = sum_low / np.maximum(weight_low, 1)
+    mean_high = (sum_low[:, -1:] - sum_low) / np.maximum(weight_high, 1)
+    between = weight_low * weight_high * (mean_low - mean_high) ** 2
+    threshold = between.argmax(axis=1).astype(np.uint8)
+
+    dark = gray <= threshold[:, None, None]
+    dark_fraction = dark.reshape(count, -1).mean(axis=1)
+    ink = np.where((dark_fraction <= 0.5)[:, None, None], dark, ~dark)
+
+    contrast = flat.max(axis=1).astype(np.int16) - flat.min(axis=1)
+    ink &= (contrast >= min_contrast)[:, None, None]
+    return ink
+
+def thin_batch(mask: np.ndarray, max_iterations: int = 100) -> np.ndarray:
+    """
+    Zhang-Suen thinning of a (B, H, W) boolean stack to 1-pixel strokes.
+
+    Each pass evaluates every remaining ink pixel of every image at once:
+    the neighbourhood is packed into a byte and the deletion rule is a table
+    lookup. The loop runs once per peeled layer, i.e. about half the stroke
+    width, and only ever touches ink pixels.
+    """
+    padded, flat, row_stride = _pad_flat(mask)
+    ink = np.flatnonzero(flat)
+    for _ in range(max_iterations):
+        changed = False
+        for table in _neighbourhood_tables()[1:]:
+            remove = table[_neighbourhood_codes(flat, ink, row_stride)]
+            if remove.any():
+                flat[ink[remove]] = 0
+                ink = ink[~remove]
+                changed = True
+        if not changed:
+            break
+    return padded[..., 1:-1, 1:-1].astype(bool)
+
+def skeletons_from_strokes(skeleton: np.ndarray) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Find joints and limbs on a (B, H, W) stack of 1-pixel skeletons.
+
+    The stack is laid out as one tall image with an empty row between
+    frames, so connected-component labelling runs once for the whole batch.
+    Endpoints (one stroke leaving the pixel) and junctions (three or more)
+    become joints; each remaining stroke segment that touches exactly two
+    joints becomes a limb.
+
+    Returns:
+        Per image, a tuple of (joints (N, 2) int16 xy, kinds (N,) uint8,
+        limbs (M, 2) int16)
+    """
+    _require_cv2()
+    count, h, w = skeleton.shape
+    tall = np.pad(skeleton, ((0, 0), (0, 1), (0, 0))).reshape(count * (h + 1), w)
+    # Everything below works on the zero-padded tall image and its flat view
+    padded, flat, row_stride = _pad_flat(tall)
+    ink = np.flatnonzero(flat)
+
+    # Crossing number: separate strokes leaving a pixel. Unlike a plain
+    # neighbour count it is not fooled by the corners of diagonal staircases.
+    crossings = np.zeros(flat.shape, dtype=np.uint8)
+    crossings[ink] = _neighbourhood_tables()[0][_neighbourhood_codes(flat, ink, row_stride)]
+    joint_pixels = ink[(crossings[ink] == 1) | (crossings[ink] >= 3)]
+
+    # Grow joints by one pixel along the stroke so removing them really
+    # splits it into separate segments
+    joint_flat = np.zeros(flat.shape, dtype=np.uint8)
+    joint_flat[joint_pixels] = 1
+    for dy, dx in _NEIGHBOURS:
+        joint_flat[joint_pixels + (dy * row_stride + dx)] = 1
+    joint_flat &= flat
+    segment_flat = flat & (joint_flat ^ 1)
+
+    joint_count, joint_labels, joint_stats, centroids = cv2.connectedComponentsWithStats(
+        joint_flat.reshape(padded.shape), connectivity=8
+    )
+    _, segment_labels = cv2.connectedComponents(segment_flat.reshape(padded.shape), connectivity=8)
+    joint_labels = joint_labels.reshape(-1)
+    segment_labels = segment_labels.reshape(-1)
+
+    # cv2 labels 2x2 blocks, so its numbering depends on the parity of the
+    # row a frame starts on. Renumber by each joint's first pixel in raster
+    # order, which is the same wherever the frame sits in the batch.
+    joint_idx = np.flatnonzero(joint_flat)
+    present, first = np.unique(joint_labels[joint_idx], return_index=True)
+    old_labels = present[np.argsort(joint_idx[first], kind="stable")]
+    relabel = np.zeros(joint_count, dtype=joint_labels.dtype)
+    relabel[old_labels] = np.arange(1, joint_count, dtype=joint_labels.dtype)
+    joint_labels = relabel[joint_labels]
+    joint_stats = joint_stats[old_labels]
+    centroids = centroids[old_labels]
+
+    # A joint cluster is a junction if any of its pixels branches
+    max_crossings = np.zeros(joint_count, dtype=np.uint8)
+    np.maximum.at(max_crossings, joint_labels[joint_idx], crossings[joint_idx])
+    kinds = np.where(max_crossings[1:] >= 3, JUNCTION, ENDPOINT).astype(np.uint8)
+    # Centroids as exact integer coordinate sums in tall coordinates, so
+    # rounding below never depends on floating-point error
+    areas = joint_stats[:, cv2.CC_STAT_AREA].astype(np.int64)
+    sums = np.rint(centroids * areas[:, None]).astype(np.int64) - areas[:, None]
+
+    # Segment/joint contacts through any of the 8 neighbour directions,
+    # packed into one int64 so np.unique stays one-dimensional
+    segment_idx = np.flatnonzero(segment_flat)
+    packed = []
+    for dy, dx in _NEIGHBOURS:
+        touched = joint_labels[segment_idx + (dy * row_stride + dx)]
+        hit = touched > 0
+        packed.append(segment_labels[segment_idx[hit]].astype(np.int64) * joint_count + touched[hit])
+    packed = np.unique(np.concatenate(packed))
+    contacts = np.stack([packed // joint_count, packed % joint_count], axis=1)
+
+    limbs = np.empty((0, 2), dtype=np.int64)
+    if len(contacts):
+        _, first, per_segment = np.unique(contacts[:, 0], return_index=True, return_counts=True)
+        two_ended = first[per_segment == 2]
+        # Contacts are sorted by joint within a segment, so pairs come out ordered;
+        # dedupe parallel strokes between the same joints
+        pairs = np.unique(contacts[two_ended, 1] * joint_count + contacts[two_ended + 1, 1])
+        limbs = np.stack([pairs // joint_count, pairs % joint_count], axis=1) - 1
+
+    # Joint labels follow raster order, so joints (and limbs, sorted by their
+    # first joint) are already grouped by frame
+    frame_of_joint = sums[:, 1] // areas // (h + 1)
+    joint_bounds = np.searchsorted(frame_of_joint, np.arange(count + 1))
+    limb_bounds = np.searchsorted(limbs[:, 0], joint_bounds)
+    # Into frame coordinates before rounding (half up), so a joint lands on
+    # the same pixel wherever its image sits in the batch
+    sums[:, 1] -= frame_of_joint * (h + 1) * areas
+    joints = ((2 * sums + areas[:, None]) // (2 * areas[:, None])).astype(np.int16)
+
+    results = []
+    for i in range(count):
+        start, stop = joint_bounds[i], joint_bounds[i + 1]
+        results.append((
+            joints[start:stop],
+            kinds[start:stop],
+            (limbs[limb_bounds[i]:limb_bounds[i + 1]] - start).astype(np.int16)
+        ))
+    return results
+
+def extract_skeletons(images: Union[Sequence[np.ndarray], np.ndarray], size: int = 256) -> List[StickSkeleton]:
+    """
+    Turn drawings into stick-figure skeletons.
+
+    Args:
+        images: List of grayscale/RGB/RGBA arrays of any size, or a stacked
+            (B, size, size) uint8 grayscale array
+        size: Side of the square working grid
+
+    Returns:
+        One StickSkeleton per input image, in order
+    """
+    gray, scales, offsets = prepare_batch(images, size)
+    if gray.shape[0] == 0:
+        return []
+    strokes = thin_batch(binarize_batch(gray))
+    return [
+        StickSkeleton(
+            joints=joints,
+            kinds=kinds,
+            limbs=limbs,
+            size=size,
+            scale=float(scales[i]),
+            offset=(float(offsets[i][0]), float(offsets[i][1]))
+        )
+        for i, (joints, kinds, limbs) in enumerate(skeletons_from_strokes(strokes))
+    ]
+
+def extract_skeletons_parallel(
+    images: Union[Sequence[np.ndarray], np.ndarray],
+    size: int = 256,
+    workers: Optional[int] = None,
+    chunk_size: int = 32
+) -> List[StickSkeleton]:
+    """
+    Run `extract_skeletons` over chunks of `images` in a process pool.
+
+    Each worker gets `chunk_size` images so the per-batch array work stays
+    large enough to amortise process hand-off.
+    """
+    chunks = [images[i:i + chunk_size] for i in range(0, len(images), chunk_size)]
+    if workers == 1 or len(chunks) <= 1:
+        return [skeleton for chunk in chunks for skeleton in extract_skeletons(chunk, size)]
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        results = executor.map(extract_skeletons, chunks, [size] * len(chunks))
+        return [skeleton for chunk in results for skeleton in chunk]
+
+@dataclass
+class FrameSkeleton:
+    frame_index: int
+    timestamp: float
+    skeleton: StickSkeleton
+
+@contextmanager
+def video_file(source: Union[str, BinaryIO], chunk_size: int = 1024 * 1024) -> Iterator[str]:
+    """
+    Yield a filesystem path for a video, as cv2.VideoCapture needs one.
+
+    Paths are used as-is; file objects (e.g. an UploadFile's spooled file)
+    are copied to a temp file in fixed-size chunks.
+    """
+    if isinstance(source, str):
+        yield source
+        return
+
+    with tempfile.NamedTemporaryFile(suffix='.mp4') as temp:
+        source.seek(0)
+        shutil.copyfileobj(source, temp, chunk_size)
+        temp.flush()
+        yield temp.name
+
+def iter_video_frames(
+    video_path: str,
+    every_nth: int = 1,
+    keyframes_only: bool = False,
+    scene_threshold: float = 12.0
+) -> Iterator[Tuple[int, float, np.ndarray]]:
+    """
+    Decode a video one frame at a time.
+
+    Frames that are not sampled are only grabbed, never converted. With
+    `keyframes_only`, a sampled frame is emitted only when its 32x32
+    grayscale thumbnail differs from the last emitted one by more than
+    `scene_threshold` grey levels on average, i.e. on scene/pose changes.
+
+    Yields:
+        (frame index, timestamp in seconds, BGR frame)
+    """
+    _require_cv2()
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        raise ValueError(f"Could not open video {video_path}")
+    fps = capture.get(cv2.CAP_PROP_FPS) or 0.0
+    every_nth = max(1, every_nth)
+    last_thumb = None
+    index = -1
+    try:
+        while capture.grab():
+            index += 1
+            if index % every_nth:
+                continue
+            ok, frame = capture.retrieve()
+            if not ok:
+                break
+            if keyframes_only:
+                thumb = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), (32, 32),
+                                   interpolation=cv2.INTER_AREA).astype(np.int16)
+                if last_thumb is not None and np.abs(thumb - last_thumb).mean() <= scene_threshold:
+                    continue
+                last_thumb = thumb
+            yield index, index / fps if fps else 0.0, frame
+    finally:
+        capture.release()
+
+def _extract_frames(frames: np.ndarray, size: int) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """Worker entry point: skeletons for a prepared (B, size, size) stack."""
+    return skeletons_from_strokes(thin_batch(binarize_batch(frames)))
+
+def process_video(
+    video_path: str,
+    every_nth: int = 1,
+    keyframes_only: bool = False,
+    chunk_size: int = 16,
+    workers: Optional[int] = None,
+    max_pending: Optional[int] = None,
+    size: int = 256
+) -> Iterator[FrameSkeleton]:
+    """
+    Stream stick-figure skeletons for the frames of a video.
+
+    Frames are decoded lazily, shrunk to the working grid in chunks of
+    `chunk_size` and extracted in a process pool. At most `max_pending`
+    chunks (default two per worker) are in flight, so memory depends on the
+    chunk size and worker count, never on clip length. Results are yielded
+    in frame order as soon as their chunk finishes.
+    """
+    frames = iter_video_frames(video_path, every_nth, keyframes_only)
+    executor = None
+    if workers != 1:
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        max_pending = max_pending or 2 * executor._max_workers
+    pending = deque()
+
+    def collect(meta, result) -> Iterator[FrameSkeleton]:
+        indices, timestamps, scales, offsets = meta
+        for i, (joints, kinds, limbs) in enumerate(result):
+            yield FrameSkeleton(
+                frame_index=indices[i],
+                timestamp=timestamps[i],
+                skeleton=StickSkeleton(
+                    joints=joints,
+                    kinds=kinds,
+                    limbs=limbs,
+                    size=size,
+                    scale=float(scales[i]),
+                    offset=(float(offsets[i][0]), float(offsets[i][1]))
+                )
+            )
+
+    try:
+        while True:
+            chunk = list(islice(frames, chunk_size))
+            if not chunk:
+                break
+            indices, timestamps, raw = zip(*chunk)
+            stack, scales, offsets = prepare_batch(raw, size)
+            del chunk, raw
+            meta = (indices, timestamps, scales, offsets)
+
+            if executor is None:
+                yield from collect(meta, _extract_frames(stack, size))
+                continue
+
+            pending.append((meta, executor.submit(_extract_frames, stack, size)))
+            while len(pending) >= max_pending:
+                done_meta, future = pending.popleft()
+                yield from collect(done_meta, future.result())
+
+        while pending:
+            done_meta, future = pending.popleft()
+            yield from collect(done_meta, future.result())
+    finally:
+        frames.close()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+def render_skeleton(skeleton: StickSkeleton, thickness: int = 3) -> np.ndarray:
+    """Draw a skeleton as black limbs and joints on a white size x size canvas."""
+    _require_cv2()
+    canvas = np.full((skeleton.size, skeleton.size), 255, dtype=np.uint8)
+    for a, b in skeleton.limbs:
+        cv2.line(canvas, tuple(int(v) for v in skeleton.joints[a]), tuple(int(v) for v in skeleton.joints[b]),
+                 0, thickness, cv2.LINE_AA)
+    for (x, y), kind in zip(skeleton.joints, skeleton.kinds):
+        cv2.circle(canvas, (int(x), int(y)), thickness + (2 if kind == JUNCTION else 1), 0, -1, cv2.LINE_AA)
+    return canvas
 
 async def process_stick_figure_upload(file: UploadFile) -> ProcessedImage:
     try:
@@ -31,7 +513,7 @@ async def process_stick_figure_upload(file: UploadFile) -> ProcessedImage:
         
         # If neither library is available, return original data
         if cv2 is None and Image is None:
-            print("Warning: No image processing libraries available")
+            logger.warning("No image processing libraries available")
             # Convert bytes to base64 string
             base64_data = base64.b64encode(image_data).decode('utf-8')
             return ProcessedImage(
@@ -45,25 +527,29 @@ async def process_stick_figure_upload(file: UploadFile) -> ProcessedImage:
             # Try PIL first if available
             if Image is not None:
                 image = Image.open(io.BytesIO(image_data))
-                # Process with PIL
-                # Add your PIL-based processing here
+                # Process with PIL: extract the skeleton and draw it
+                skeleton = extract_skeletons([np.asarray(image.convert('L'))])[0]
+                image = Image.fromarray(render_skeleton(skeleton))
                 
                 # Convert back to base64 string
                 buffered = io.BytesIO()
-                image.save(buffered, format=image.format or 'PNG')
+                image.save(buffered, format='PNG')
                 img_str = base64.b64encode(buffered.getvalue()).decode('utf-8')
                 return ProcessedImage(
                     data=img_str,
-                    content_type=f'image/{image.format.lower()}' if image.format else 'image/png',
-                    success=True
+                    content_type='image/png',
+                    success=True,
+                    skeleton=skeleton
                 )
                 
             # Fall back to OpenCV if PIL fails
             if cv2 is not None:
                 nparr = np.frombuffer(image_data, np.uint8)
-                img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+                img = cv2.imdecode(nparr, cv2.IMREAD_GRAYSCALE)
                 
-                # Your OpenCV processing here
+                # OpenCV processing: extract the skeleton and draw it
+                skeleton = extract_skeletons([img])[0]
+                img = render_skeleton(skeleton)
                 
                 # Convert back to base64 string
                 _, buffer = cv2.imencode('.png', img)
@@ -71,11 +557,12 @@ async def process_stick_figure_upload(file: UploadFile) -> ProcessedImage:
                 return ProcessedImage(
                     data=img_str,
                     content_type='image/png',
-                    success=True
+                    success=True,
+                    skeleton=skeleton
                 )
                 
         except Exception as e:
-            print(f"Error processing image: {e}")
+            logger.warning("Stick figure processing failed", extra={"error": str(e)})
             # Convert original data to base64 string
             base64_data = base64.b64encode(image_data).decode('utf-8')
             return ProcessedImage(
@@ -87,4 +574,87 @@ async def process_stick_figure_upload(file: UploadFile) -> ProcessedImage:
             
     finally:
         # Reset file position for potential future reads
-        await file.seek(0) 
\ No newline at end of file
+        await file.seek(0)
+
+def _encode_image(image, fmt: str, max_size: int, quality: int = 80) -> bytes:
+    """Downscale to fit in max_size x max_size and encode as WEBP or JPEG."""
+    image = image.copy()
+    image.thumbnail((max_size, max_size), Image.LANCZOS)
+
+    has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+    if fmt == 'JPEG' or not has_alpha:
+        if has_alpha:
+            # Flatten transparent drawings onto white rather than black
+            rgba = image.convert('RGBA')
+            image = Image.new('RGB', rgba.size, (255, 255, 255))
+            image.paste(rgba, mask=rgba.split()[-1])
+        else:
+            image = image.convert('RGB')
+    else:
+        image = image.convert('RGBA')
+
+    buffered = io.BytesIO()
+    image.save(buffered, format=fmt, quality=quality)
+    return buffered.getvalue()
+
+def read_poster_frame(video_path: str, max_frames: int = 30) -> np.ndarray:
+    """
+    Pick a poster frame from the start of a video.
+
+    Returns the first of the leading `max_frames` frames that is not almost
+    black (fade-ins are common), falling back to the very first frame.
+    """
+    capture = cv2.VideoCapture(video_path)
+    try:
+        first = None
+        for _ in range(max_frames):
+            ok, frame = capture.read()
+            if not ok:
+                break
+            if first is None:
+                first = frame
+            if frame.mean() > 16:
+                return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        if first is None:
+            raise ValueError("Could not decode any video frames")
+        return cv2.cvtColor(first, cv2.COLOR_BGR2RGB)
+    finally:
+        capture.release()
+
+def build_derivatives(
+    path: str,
+    content_type: str,
+    thumbnail_size: int = 256,
+    poster_size: int = 1280
+) -> Dict[str, Tuple[bytes, str]]:
+    """
+    Produce the small renditions used by listing pages.
+
+    CPU-bound and synchronous so it can run in a process pool.
+
+    Args:
+        path: Local file holding the original image or video
+        content_type: MIME type of the original
+        thumbnail_size: Bounding box for thumbnails in pixels
+        poster_size: Bounding box for the video poster frame in pixels
+
+    Returns:
+        Mapping of derivative name to (encoded bytes, content type)
+    """
+    if Image is None:
+        raise RuntimeError("PIL is required to build derivatives")
+
+    derivatives = {}
+    if content_type.startswith('video/'):
+        if cv2 is None:
+            raise RuntimeError("OpenCV is required to extract video poster frames")
+        image = Image.fromarray(read_poster_frame(path))
+        derivatives['poster'] = (_encode_image(image, 'JPEG', poster_size, quality=85), 'image/jpeg')
+    else:
+        image = Image.open(path)
+        # First frame for animated GIFs
+        image.seek(0)
+
+    derivatives['thumb_webp'] = (_encode_image(image, 'WEBP', thumbnail_size), 'image/webp')
+    derivatives['thumb_jpeg'] = (_encode_image(image, 'JPEG', thumbnail_size), 'image/jpeg')
+    return derivatives
@@ -1,5 +1,7 @@
 import logging
-from fastapi import FastAPI, File, UploadFile, HTTPException, Query, Request, Form, Body
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, File, UploadFile, HTTPException, Query, Request, Form, Body, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 import boto3
 import os
@@ -7,27 +9,209 @@ from datetime import datetime, timezone
 import uuid
 import base64
 from config import get_settings
-from fastapi.responses import JSONResponse
-from botocore.exceptions import ClientError
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+from fastapi.concurrency import run_in_threadpool
+from botocore.exceptions import BotoCoreError, ClientError
 from starlette.middleware.base import BaseHTTPMiddleware
 from typing import Optional
 import json
-from helpers.sdxlinfer import generate_styled_image
+import time
+import hashlib
+from email.utils import format_datetime, formatdate, parsedate_to_datetime
+from helpers.sdxlinfer import generate_styled_image, get_client, close_client, build_payload, payload_key, batch_stats
+from helpers.s3fetch import S3FetchEngine
+from helpers.jobs import JobQueue, TERMINAL_STATUSES
+from helpers.gencache import GenerationCache
+from helpers.singleflight import SingleFlight
+from helpers.s3upload import stream_to_s3, UploadTooLarge
+from helpers.derivatives import DerivativePipeline
+from helpers.gallerycache import GalleryCache
+from helpers.searchindex import PromptIndex
+from helpers.metrics import (
+    REGISTRY, CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, instrument_boto_client,
+    GENERATIONS_IN_FLIGHT, PAYLOAD_SIZE, CACHE_REQUESTS
+)
+from helpers.logs import configure_logging, shutdown_logging, get_logger
 from pydantic import BaseModel
 
-app = FastAPI()
+settings = get_settings()
+
+configure_logging(settings.log_level)
+logger = get_logger("api")
+
+# AWS clients and everything built on them are created in `lifespan`, so
+# importing this module stays cheap and replicas can report liveness early
+s3_client = None
+dynamodb = None
+table = None
+s3_fetcher: Optional[S3FetchEngine] = None
+generation_cache: Optional[GenerationCache] = None
+derivative_pipeline: Optional[DerivativePipeline] = None
+prompt_index: Optional[PromptIndex] = None
+
+# Readiness as reported by /ping and /ready; filled in by the warm-up task
+readiness = {"ready": False, "checks": {}}
+
+def _create_aws_clients():
+    s3 = boto3.client(
+        's3',
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+        region_name=settings.AWS_REGION
+    )
+    dynamo = boto3.resource(
+        'dynamodb',
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+        region_name=settings.AWS_REGION
+    )
+    return s3, dynamo
+
+async def _warm_check(name: str, call) -> str:
+    """
+    Run one warm-up call. Any response from the service, including an
+    access error, means DNS, TLS and a pooled connection are in place.
+    """
+    try:
+        await call()
+        return "ok"
+    except ClientError:
+        return "ok"
+    except (BotoCoreError, Exception) as e:
+        logger.warning("Warm-up failed", extra={"check": name, "error": str(e)})
+        return f"error: {e}"
+
+# Datastores the API cannot serve without; SDXL is only reported
+REQUIRED_CHECKS = ("s3", "dynamodb")
+
+async def _warm_up():
+    """
+    Open connections to S3, DynamoDB and SDXL ahead of the first request.
+
+    The app turns ready once every required check passes; failing required
+    checks are retried with backoff until they do.
+    """
+    checks = {
+        "s3": lambda: run_in_threadpool(s3_client.head_bucket, Bucket=settings.S3_BUCKET_NAME),
+        "dynamodb": lambda: run_in_threadpool(
+            table.get_item, Key={"user_id": "__warmup__", "creation_id": "__warmup__"}
+        ),
+        "sdxl": lambda: get_client().head(settings.sdxl_endpoint_url, timeout=settings.warmup_timeout),
+    }
+    pending = dict(checks)
+    delay = min(1.0, settings.warmup_retry_max_interval)
+    while True:
+        results = await asyncio.gather(*(_warm_check(name, call) for name, call in pending.items()))
+        readiness["checks"] = {**readiness["checks"], **dict(zip(pending, results))}
+        failing = [name for name in REQUIRED_CHECKS if readiness["checks"].get(name) != "ok"]
+        if not failing:
+            readiness["ready"] = True
+            logger.info("Warm-up finished", extra={"checks": readiness["checks"]})
+            return
+        logger.warning("Not ready, retrying", extra={"failing": failing, "retry_in": delay})
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, settings.warmup_retry_max_interval)
+        pending = {name: checks[name] for name in failing}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global s3_client, dynamodb, table, s3_fetcher, generation_cache, derivative_pipeline, prompt_index
+
+    # Client construction loads botocore's service models; keep it off the loop
+    s3_client, dynamodb = await run_in_threadpool(_create_aws_clients)
+    table = dynamodb.Table('stickgen_animations')
+
+    # Per-operation latency for every S3 and DynamoDB call, including helpers'
+    instrument_boto_client(s3_client, "s3")
+    instrument_boto_client(dynamodb.meta.client, "dynamodb")
+    logger.info("AWS clients ready", extra={"region": settings.AWS_REGION, "bucket": settings.S3_BUCKET_NAME})
+
+    # Shared pool for concurrent S3 reads
+    s3_fetcher = S3FetchEngine(s3_client, max_workers=settings.s3_fetch_max_workers)
+
+    # Opt-in cache of finished generations keyed by payload hash
+    if settings.generation_cache_enabled:
+        generation_cache = GenerationCache(
+            s3_client,
+            settings.S3_BUCKET_NAME,
+            max_entries=settings.generation_cache_max_entries,
+            ttl=settings.generation_cache_ttl,
+            redis_url=settings.redis_url
+        )
+
+    # Thumbnails and poster frames, rendered off the event loop
+    if settings.derivatives_enabled:
+        derivative_pipeline = DerivativePipeline(
+            s3_client,
+            table,
+            settings.S3_BUCKET_NAME,
+            max_workers=settings.derivative_workers,
+            thumbnail_size=settings.thumbnail_size,
+            poster_size=settings.poster_size,
+            on_update=_invalidate_gallery
+        )
+
+    # Keyword search over prompts, built per user on first search
+    if settings.search_index_enabled:
+        prompt_index = PromptIndex(
+            table,
+            max_users=settings.search_index_max_users,
+            ttl=settings.search_index_ttl
+        )
+
+    await generation_jobs.start()
+
+    warm_up = None
+    if settings.warmup_enabled:
+        # In the background: the server answers /ping while connections open
+        warm_up = asyncio.create_task(_warm_up())
+    else:
+        readiness["ready"] = True
+
+    try:
+        yield
+    finally:
+        readiness["ready"] = False
+        if warm_up is not None:
+            warm_up.cancel()
+        await generation_jobs.stop()
+        s3_fetcher.shutdown()
+        await close_client()
+        if derivative_pipeline is not None:
+            derivative_pipeline.shutdown()
+        if generation_cache is not None:
+            await generation_cache.close()
+        if gallery_cache is not None:
+            await gallery_cache.close()
+        # Last: flush whatever shutdown logged
+        shutdown_logging()
+
+# orjson for every JSON body; several times faster than json.dumps on galleries
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
+
+ALLOWED_CONTENT_TYPES = ["image/jpeg", "image/png", "image/gif", "video/mp4"]
+# Allowance for multipart boundaries and form fields around the file
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
 # logging.getLogger("uvicorn.access").handlers = []
 # uvicorn_logger = logging.getLogger("uvicorn.access")
 # handler = logging.StreamHandler()
 # handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
 # uvicorn_logger.addHandler(handler)
 
-class IgnorePingLogsMiddleware(BaseHTTPMiddleware):
+class UploadSizeLimitMiddleware(BaseHTTPMiddleware):
+    """Reject oversized uploads from Content-Length before the body is read."""
     async def dispatch(self, request: Request, call_next):
-        if request.url.path == "/ping":
-            return await call_next(request)
-        response = await call_next(request)
-        return response
+        if request.method == "POST" and request.url.path.startswith("/upload/"):
+            content_length = request.headers.get("content-length")
+            if content_length and content_length.isdigit() and \
+                    int(content_length) > settings.upload_max_bytes + MULTIPART_OVERHEAD_BYTES:
+                return ORJSONResponse(
+                    status_code=413,
+                    content={"detail": f"File exceeds the {settings.upload_max_bytes} byte limit"}
+                )
+        return await call_next(request)
+
 class IgnorePingFilter(logging.Filter):
     def filter(self, record):
         return "GET /ping" not in record.getMessage()
@@ -35,7 +219,7 @@ class IgnorePingFilter(logging.Filter):
 # Apply the filter to uvicorn access logger
 logging.getLogger("uvicorn.access").addFilter(IgnorePingFilter())
     
-app.add_middleware(IgnorePingLogsMiddleware)
+app.add_middleware(UploadSizeLimitMiddleware)
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -44,54 +228,124 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Outermost, so rejected uploads and CORS preflights are timed too
+app.add_middleware(MetricsMiddleware)
 
-settings = get_settings()
+generation_flights = SingleFlight("generation")
 
-print(f"AWS Region: {settings.AWS_ACCESS_KEY_ID}")
-print(f"S3 Bucket: {settings.AWS_SECRET_ACCESS_KEY}")
+# Per-user gallery pages, invalidated on every write to the user's items
+gallery_cache = None
+if settings.gallery_cache_enabled:
+    gallery_cache = GalleryCache(
+        max_entries=settings.gallery_cache_max_entries,
+        max_bytes=settings.gallery_cache_max_bytes,
+        ttl=settings.gallery_cache_ttl,
+        redis_url=settings.redis_url
+    )
 
-# Initialize AWS clients
-s3_client = boto3.client(
-    's3',
-    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-    region_name=settings.AWS_REGION
-)
-
-# Initialize DynamoDB
-dynamodb = boto3.resource(
-    'dynamodb',
-    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-    region_name=settings.AWS_REGION
-)
-table = dynamodb.Table('stickgen_animations')
 @app.get("/")
 async def root():
     return {"message": "Welcome to StickGen API"}
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition of the process-wide registry."""
+    return Response(REGISTRY.render(), media_type=METRICS_CONTENT_TYPE)
+
 @app.get("/ping")
 async def ping(id: str = Query(None), port: int = Query(None)):
+    """Liveness: always 200 while the process serves requests. `ready` says whether S3 and DynamoDB are reachable."""
     return {
         "status": "ok",
         "id": id,
-        "port": port
+        "port": port,
+        "live": True,
+        "ready": readiness["ready"],
+        "checks": readiness["checks"]
+    }
+
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 503 until S3 and DynamoDB have answered a warm-up call."""
+    if not readiness["ready"]:
+        return ORJSONResponse(status_code=503, content={"ready": False, "checks": readiness["checks"]})
+    return {"ready": True, "checks": readiness["checks"]}
+
+def _user_style(user_id: str, style: str) -> str:
+    """Hash key of the style index: one partition per user and style."""
+    return f"{user_id}#{style}"
+
+async def _record_upload(
+    user_id: str,
+    creation_id: str,
+    filename: str,
+    original_filename: Optional[str],
+    content_type: str,
+    prompt: Optional[str],
+    style_id: Optional[str],
+    if_new: bool = False
+) -> dict:
+    """
+    Add an upload to the user's gallery. With `if_new`, the write fails with
+    ConditionalCheckFailedException when the item already exists.
+    """
+    metadata = {
+        "prompt": prompt,
+        "user_id": user_id,
+        "style": style_id,
+        "creation_id": creation_id,
+        "filename": filename,  # Using the same filename for both
+        "content_type": content_type,
+        "original_filename": original_filename  # Store the original filename if needed
+    }
+    if style_id:
+        metadata["user_style"] = _user_style(user_id, style_id)
+    put_kwargs = {'ConditionExpression': 'attribute_not_exists(creation_id)'} if if_new else {}
+    await run_in_threadpool(table.put_item, Item=metadata, **put_kwargs)
+    await _invalidate_gallery(user_id)
+    if prompt_index is not None:
+        prompt_index.add(user_id, creation_id, prompt, style_id)
+    if derivative_pipeline is not None:
+        derivative_pipeline.schedule(user_id, creation_id, f"animations/{user_id}/{filename}", content_type)
+    return metadata
+
+async def _record_generation(user_id: str, s3_key: str, prompt: str, style: str, creation_id: Optional[str] = None) -> dict:
+    """Add a stored generation to the user's gallery."""
+    metadata = {
+        "prompt": prompt,
+        "user_id": user_id,
+        "style": style,
+        "creation_id": creation_id or datetime.now(timezone.utc).isoformat(),
+        "filename": os.path.basename(s3_key),
+        "s3_key": s3_key,
+        "content_type": "image/png",
+        "kind": "generation"
     }
+    if style:
+        metadata["user_style"] = _user_style(user_id, style)
+    await run_in_threadpool(table.put_item, Item=metadata)
+    await _invalidate_gallery(user_id)
+    if prompt_index is not None:
+        prompt_index.add(user_id, metadata["creation_id"], prompt, style)
+    if derivative_pipeline is not None:
+        derivative_pipeline.schedule(user_id, metadata["creation_id"], s3_key, "image/png")
+    return metadata
 
 @app.post("/upload/{user_id}")
 async def upload_file(file: UploadFile = File(...), prompt: Optional[str] = Body(None), user_id: str = None, style_id: str = None):
-    print(f"Uploading file:")
     try:
         # Validate file type
-        allowed_types = ["image/jpeg", "image/png", "image/gif", "video/mp4"]
-        if file.content_type not in allowed_types:
+        if file.content_type not in ALLOWED_CONTENT_TYPES:
             raise HTTPException(
                 status_code=400,
                 detail="File type not allowed. Please upload an image or video file."
             )
 
-        # Read file content
-        content = await file.read()
+        if file.size is not None and file.size > settings.upload_max_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File exceeds the {settings.upload_max_bytes} byte limit"
+            )
 
         # Generate filenames - use the same filename for both S3 and DynamoDB
         file_extension = os.path.splitext(file.filename)[1]
@@ -99,30 +353,27 @@ async def upload_file(file: UploadFile = File(...), prompt: Optional[str] = Body
         creation_id = str(datetime.now(timezone.utc).isoformat())
 
         try:
-            # Upload to S3
+            # Stream to S3 in chunks, multipart for anything over one chunk
             s3_key = f"animations/{user_id}/{unique_filename}"
-            s3_client.put_object(
-                Bucket=settings.S3_BUCKET_NAME,
-                Key=s3_key,
-                Body=content,
-                ContentType=file.content_type,
-                Metadata={
+            size = await stream_to_s3(
+                s3_client,
+                settings.S3_BUCKET_NAME,
+                s3_key,
+                file,
+                content_type=file.content_type,
+                metadata={
                     'original_filename': file.filename,
                     'upload_date': str(datetime.now(timezone.utc).isoformat())
-                }
+                },
+                chunk_size=settings.upload_chunk_bytes,
+                max_size=settings.upload_max_bytes
             )
 
-            # Store metadata in DynamoDB
-            metadata = {
-                "prompt": prompt,
-                "user_id": user_id,
-                "style": style_id,
-                "creation_id": creation_id,
-                "filename": unique_filename,  # Using the same filename for both
-                "original_filename": file.filename  # Store the original filename if needed
-            }
+            PAYLOAD_SIZE.observe(size, kind="upload")
+            logger.info("Upload stored", extra={"user_id": user_id, "s3_key": s3_key, "bytes": size})
 
-            table.put_item(Item=metadata)
+            # Store metadata in DynamoDB
+            await _record_upload(user_id, creation_id, unique_filename, file.filename, file.content_type, prompt, style_id)
 
             return {
                 "status": "success",
@@ -130,6 +381,8 @@ async def upload_file(file: UploadFile = File(...), prompt: Optional[str] = Body
                 "filename": unique_filename
             }
 
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
         except Exception as e:
             raise HTTPException(
                 status_code=500,
@@ -139,162 +392,895 @@ async def upload_file(file: UploadFile = File(...), prompt: Optional[str] = Body
     except HTTPException as he:
         raise he
     except Exception as e:
-        print(e)
+        logger.exception("Upload failed", extra={"user_id": user_id})
         raise HTTPException(
             status_code=500,
             detail=f"An error occurred while processing the file: {str(e)}"
         )
 
+class PresignUploadRequest(BaseModel):
+    filename: str
+    content_type: str
+    size: int
+
+class FinalizeUploadRequest(BaseModel):
+    s3_key: str
+    prompt: Optional[str] = None
+    style_id: Optional[str] = None
+
+@app.post("/upload/{user_id}/presign")
+async def presign_upload(user_id: str, body: PresignUploadRequest):
+    """
+    First step of a direct-to-S3 upload.
+
+    Returns a presigned POST that only accepts the declared content type and
+    at most `upload_max_bytes`. After posting the file to S3 the client calls
+    `/upload/{user_id}/finalize` with the returned `s3_key`.
+
+    The gallery item's creation_id is fixed here and signed into the object
+    metadata, so finalize always writes the same item for a key.
+    """
+    if body.content_type not in ALLOWED_CONTENT_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail="File type not allowed. Please upload an image or video file."
+        )
+    if body.size <= 0 or body.size > settings.upload_max_bytes:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File exceeds the {settings.upload_max_bytes} byte limit"
+        )
+
+    file_extension = os.path.splitext(body.filename)[1]
+    unique_filename = f"{os.urandom(16).hex()}{file_extension}"
+    s3_key = f"animations/{user_id}/{unique_filename}"
+    creation_id = datetime.now(timezone.utc).isoformat()
+    try:
+        presigned = s3_client.generate_presigned_post(
+            Bucket=settings.S3_BUCKET_NAME,
+            Key=s3_key,
+            Fields={
+                "Content-Type": body.content_type,
+                "x-amz-meta-original-filename": body.filename,
+                "x-amz-meta-creation-id": creation_id
+            },
+            Conditions=[
+                {"Content-Type": body.content_type},
+                {"x-amz-meta-original-filename": body.filename},
+                {"x-amz-meta-creation-id": creation_id},
+                ["content-length-range", 1, settings.upload_max_bytes]
+            ],
+            ExpiresIn=settings.presigned_url_expiry
+        )
+    except Exception as e:
+        logger.exception("Presign failed", extra={"user_id": user_id})
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error creating upload URL: {str(e)}"
+        )
+
+    return {
+        "status": "success",
+        "url": presigned["url"],
+        "fields": presigned["fields"],
+        "s3_key": s3_key,
+        "filename": unique_filename
+    }
+
+@app.post("/upload/{user_id}/finalize")
+async def finalize_upload(user_id: str, body: FinalizeUploadRequest):
+    """
+    Validate a directly uploaded object and record it in DynamoDB.
+
+    Idempotent: finalizing a key again returns the item recorded the first
+    time instead of adding another. Objects that did not come through
+    `/presign` (and so carry no creation id) are rejected.
+    """
+    prefix = f"animations/{user_id}/"
+    filename = body.s3_key[len(prefix):]
+    if not body.s3_key.startswith(prefix) or not filename or "/" in filename:
+        raise HTTPException(status_code=400, detail="Invalid upload key")
+
+    try:
+        head = await run_in_threadpool(
+            s3_client.head_object,
+            Bucket=settings.S3_BUCKET_NAME,
+            Key=body.s3_key
+        )
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey'):
+            raise HTTPException(status_code=404, detail="Upload not found")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error checking upload in S3: {str(e)}"
+        )
+
+    content_type = head.get('ContentType')
+    if content_type not in ALLOWED_CONTENT_TYPES or head['ContentLength'] > settings.upload_max_bytes:
+        logger.warning("Rejected direct upload", extra={"user_id": user_id, "s3_key": body.s3_key, "content_type": content_type})
+        await run_in_threadpool(
+            s3_client.delete_object,
+            Bucket=settings.S3_BUCKET_NAME,
+            Key=body.s3_key
+        )
+        raise HTTPException(status_code=400, detail="Uploaded object failed validation")
+
+    creation_id = head.get('Metadata', {}).get('creation-id')
+    if not creation_id:
+        raise HTTPException(status_code=409, detail="Object is not a pending direct upload")
+
+    try:
+        await _record_upload(
+            user_id,
+            creation_id,
+            filename,
+            head.get('Metadata', {}).get('original-filename'),
+            content_type,
+            body.prompt,
+            body.style_id,
+            if_new=True
+        )
+    except ClientError as e:
+        if _client_error_code(e) != 'ConditionalCheckFailedException':
+            logger.exception("Finalize failed", extra={"user_id": user_id, "s3_key": body.s3_key})
+            raise HTTPException(
+                status_code=500,
+                detail=f"Error saving upload metadata: {str(e)}"
+            )
+        # A retry of a finalize that already went through
+        existing = (await run_in_threadpool(
+            table.get_item,
+            Key={'user_id': user_id, 'creation_id': creation_id}
+        )).get('Item')
+        if existing is None or existing.get('filename') != filename:
+            raise HTTPException(status_code=409, detail="Upload was already recorded for another object")
+        logger.info("Finalize repeated", extra={"user_id": user_id, "s3_key": body.s3_key})
+    except Exception as e:
+        logger.exception("Finalize failed", extra={"user_id": user_id, "s3_key": body.s3_key})
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error saving upload metadata: {str(e)}"
+        )
+
+    return {
+        "status": "success",
+        "s3_key": body.s3_key,
+        "filename": filename,
+        "animation_id": creation_id
+    }
+
+def _encode_cursor(last_evaluated_key: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(last_evaluated_key).encode('utf-8')).decode('utf-8')
+
+def _decode_cursor(cursor: str, user_id: str) -> dict:
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode('utf-8')))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid gallery cursor")
+    if not isinstance(key, dict) or key.get('user_id') != user_id:
+        raise HTTPException(status_code=400, detail="Invalid gallery cursor")
+    return key
+
+def _gallery_item(animation: dict, s3_key: str) -> dict:
+    return {
+        "animation_id": animation.get('creation_id'),
+        "user_id": animation['user_id'],
+        "filename": animation['filename'],
+        "original_filename": animation.get('original_filename'),
+        "created_at": animation.get('creation_id'),
+        "content_type": animation.get('content_type'),
+        "s3_url": s3_key,
+        "prompt": animation.get('prompt'),
+        "style": animation.get('style'),
+        "kind": animation.get('kind', 'upload'),
+        "derivatives": animation.get('derivatives'),
+        "media_url": _media_path(s3_key),
+        "thumbnail_media_urls": {
+            name: _media_path(key) for name, key in (animation.get('derivatives') or {}).items()
+        }
+    }
+
+def _item_s3_key(animation: dict) -> str:
+    # Generations record their key; uploads live under animations/
+    return animation.get('s3_key') or f"animations/{animation['user_id']}/{animation['filename']}"
+
+def _listing_item(animation: dict) -> dict:
+    """Gallery item with presigned URLs, as returned by metadata listings."""
+    s3_key = _item_s3_key(animation)
+    item = _gallery_item(animation, s3_key)
+    item["url"] = _presigned_get(s3_key)
+    # Small renditions for tiles, once the derivative pipeline has run
+    item["thumbnail_urls"] = {
+        name: _presigned_get(key)
+        for name, key in (animation.get('derivatives') or {}).items()
+    }
+    return item
+
+def _presigned_get(s3_key: str) -> str:
+    return s3_client.generate_presigned_url(
+        'get_object',
+        Params={'Bucket': settings.S3_BUCKET_NAME, 'Key': s3_key},
+        ExpiresIn=settings.presigned_url_expiry
+    )
+
+def _gallery_etag(variant: str, animations: list, last_evaluated_key: Optional[dict]) -> str:
+    # From the stored items rather than the body: presigned URLs differ on
+    # every render, while the items (derivatives included) and the variant,
+    # which carries the presign epoch, are the same on any worker
+    state = json.dumps([variant, animations, last_evaluated_key], sort_keys=True, default=str)
+    digest = hashlib.sha1(state.encode('utf-8')).hexdigest()
+    return f'W/"{digest[:32]}"'
+
+def _gallery_modified(newest: str, updated_at: Optional[float]) -> Optional[float]:
+    # The newest item, or the last write that invalidated the user's pages
+    # (e.g. a derivative render filling in thumbnails), whichever is later
+    times = [] if updated_at is None else [updated_at]
+    try:
+        times.append(datetime.fromisoformat(newest).timestamp())
+    except ValueError:
+        pass
+    return max(times, default=None)
+
+def _gallery_headers(etag: str, modified: Optional[float]) -> dict:
+    # no-cache: browsers keep the body but revalidate with If-None-Match every time
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if modified is not None:
+        headers["Last-Modified"] = formatdate(modified, usegmt=True)
+    return headers
+
+def _not_modified(request: Request, etag: str, modified: Optional[float]) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag.removeprefix("W/") in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+            return int(modified) <= since.timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+async def _newest_creation_id(user_id: str) -> str:
+    response = await run_in_threadpool(
+        table.query,
+        KeyConditionExpression='user_id = :uid',
+        ExpressionAttributeValues={':uid': user_id},
+        ScanIndexForward=False,
+        Limit=1
+    )
+    items = response.get('Items', [])
+    return items[0]['creation_id'] if items else ""
+
+async def _invalidate_gallery(user_id: str):
+    if gallery_cache is not None:
+        await gallery_cache.invalidate(user_id)
+
 @app.get("/gallery/{user_id}")
-async def get_gallery(user_id: str = None):
+async def get_gallery(
+    request: Request,
+    user_id: str = None,
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = Query(None),
+    inline: bool = Query(False)
+):
+    """
+    List a user's animations newest first.
+
+    By default a page of metadata is returned with presigned GET URLs and a
+    `next_cursor` to fetch the following page. Pass `inline=true` to get the
+    legacy response with every object base64-encoded into `image_data`; it is
+    only paginated when `limit` is given.
+
+    Complete responses carry an ETag over the page's stored items and a
+    Last-Modified for the user's newest item or latest change to their
+    items, whichever is later. A matching If-None-Match (or a current
+    If-Modified-Since) is answered with 304 from the gallery cache, or after
+    the DynamoDB query without presigning or fetching anything.
+    Inline pages with failed fetches carry neither and are never cached.
+    """
     try:
-        print(f"Getting gallery for user_id: {user_id}")
+        if not inline and limit is None:
+            limit = settings.gallery_page_size
+        if limit is not None:
+            limit = min(limit, settings.gallery_max_page_size)
+
+        generation = None
+        if gallery_cache is not None and user_id:
+            generation = await gallery_cache.generation(user_id)
+
+        variant = f"inline={int(inline)}&limit={limit}&cursor={cursor or ''}"
+        if not inline:
+            # Presigned URLs age; start a new variant every half expiry period
+            variant += f"&epoch={int(time.time() // max(1, settings.presigned_url_expiry // 2))}"
+
+        if generation is not None:
+            cached = await gallery_cache.get(user_id, generation.token, variant)
+            if cached is not None:
+                etag, modified = cached["etag"], cached["modified"]
+                if _not_modified(request, etag, modified):
+                    CACHE_REQUESTS.inc(cache="gallery", result="not_modified")
+                    return Response(status_code=304, headers=_gallery_headers(etag, modified))
+                if cached["page"] is not None:
+                    # Stored serialized, so a hit is served without re-encoding
+                    return Response(
+                        content=cached["page"],
+                        media_type="application/json",
+                        headers=_gallery_headers(etag, modified)
+                    )
+
         if user_id:
-            response = table.query(
-                KeyConditionExpression='user_id = :uid',
-                ExpressionAttributeValues={
+            query_kwargs = {
+                'KeyConditionExpression': 'user_id = :uid',
+                'ExpressionAttributeValues': {
                     ':uid': user_id
-                }
-            )
+                },
+                'ScanIndexForward': False
+            }
+            if limit is not None:
+                query_kwargs['Limit'] = limit
+            if cursor:
+                query_kwargs['ExclusiveStartKey'] = _decode_cursor(cursor, user_id)
+            response = await run_in_threadpool(table.query, **query_kwargs)
         else:
             response = {}
         
         animations = response.get('Items', [])
-        print(f"Found {len(animations)} animations")
+        last_evaluated_key = response.get('LastEvaluatedKey')
 
-        gallery_items = []
-        for animation in animations:
-            try:
-                # Use the filename directly from DynamoDB
-                s3_key = f"animations/{animation['user_id']}/{animation['filename']}"
-                print(f"Fetching S3 object with key: {s3_key}")
-                
-                s3_response = s3_client.get_object(
-                    Bucket=settings.S3_BUCKET_NAME,
-                    Key=s3_key
-                )
-                
-                # Read the image data and convert to base64
-                image_data = s3_response['Body'].read()
-                base64_image = base64.b64encode(image_data).decode('utf-8')
-                
-                gallery_item = {
-                    "animation_id": animation.get('creation_id'),
-                    "user_id": animation['user_id'],
-                    "filename": animation['filename'],
-                    "original_filename": animation.get('original_filename'),
-                    "created_at": animation.get('creation_id'),
-                    "content_type": s3_response['ContentType'],
-                    "image_data": base64_image,
-                    "s3_url": s3_key,
-                    "prompt": animation.get('prompt'),
-                    "style": animation.get('style')
-                }
-                gallery_items.append(gallery_item)
-                
-            except ClientError as e:
-                print(f"Error fetching image from S3: {str(e)} for key {s3_key}")
-                gallery_item = {
-                    "animation_id": animation.get('creation_id'),
-                    "user_id": animation['user_id'],
-                    "filename": animation['filename'],
-                    "original_filename": animation.get('original_filename'),
-                    "created_at": animation.get('creation_id'),
-                    "content_type": None,
-                    "image_data": None,
-                    "s3_url": s3_key,
-                    "prompt": animation.get('prompt'),
-                    "style": animation.get('style'),
-                    "error": f"Failed to fetch image: {str(e)}"
-                }
-                gallery_items.append(gallery_item)
+        if generation is not None:
+            etag = _gallery_etag(variant, animations, last_evaluated_key)
+            # Only the first page is guaranteed to start at the newest item
+            newest = animations[0]['creation_id'] if animations and not cursor else await _newest_creation_id(user_id)
+            modified = _gallery_modified(newest, generation.updated_at)
+            if _not_modified(request, etag, modified):
+                # Nothing to presign or fetch; keep the validators for the next 304
+                await gallery_cache.put(user_id, generation.token, variant, {"etag": etag, "modified": modified, "page": None})
+                CACHE_REQUESTS.inc(cache="gallery", result="not_modified")
+                return Response(status_code=304, headers=_gallery_headers(etag, modified))
+
+        if inline:
+            gallery_items = [_gallery_item(animation, _item_s3_key(animation)) for animation in animations]
+        else:
+            gallery_items = [_listing_item(animation) for animation in animations]
 
-        return JSONResponse(content={
+        cacheable = True
+        if inline and gallery_items:
+            results = await s3_fetcher.fetch_many(
+                settings.S3_BUCKET_NAME,
+                [item["s3_url"] for item in gallery_items],
+                concurrency=settings.s3_fetch_concurrency,
+                timeout=settings.s3_fetch_timeout
+            )
+            for gallery_item, result in zip(gallery_items, results):
+                if result.error is None:
+                    # Convert the image data to base64
+                    gallery_item["content_type"] = result.content_type
+                    PAYLOAD_SIZE.observe(len(result.body), kind="gallery_inline")
+                    gallery_item["image_data"] = base64.b64encode(result.body).decode('ascii')
+                else:
+                    logger.warning("Gallery object fetch failed", extra={"s3_key": result.key, "error": result.error})
+                    gallery_item["content_type"] = None
+                    gallery_item["image_data"] = None
+                    gallery_item["error"] = f"Failed to fetch image: {result.error}"
+                    cacheable = False
+
+        content = {
             "status": "success",
-            "animations": gallery_items
+            "animations": gallery_items,
+            "next_cursor": _encode_cursor(last_evaluated_key) if last_evaluated_key else None
+        }
+        if not cacheable:
+            # Partial page: no validators, so the next request refetches
+            return ORJSONResponse(content=content, headers={"Cache-Control": "no-store"})
+
+        response = ORJSONResponse(content=content)
+        if generation is None:
+            return response
+
+        response.headers.update(_gallery_headers(etag, modified))
+        # Oversized pages (inline ones, mostly) keep only their validators, for 304s
+        keep_page = len(response.body) <= settings.gallery_cache_page_max_bytes
+        await gallery_cache.put(user_id, generation.token, variant, {
+            "etag": etag,
+            "modified": modified,
+            "page": response.body.decode('utf-8') if keep_page else None
         })
+        return response
 
+    except HTTPException as he:
+        raise he
     except Exception as e:
-        print(f"Gallery error: {str(e)}")
+        logger.exception("Gallery failed", extra={"user_id": user_id})
         raise HTTPException(
             status_code=500,
             detail=f"Error retrieving animations: {str(e)}"
         )
 
+def _search_bound(value: Optional[str], upper: bool) -> Optional[str]:
+    """
+    Turn a `since`/`until` parameter into a creation_id bound. Accepts ISO
+    dates and datetimes; naive values are UTC, and a bare `until` date
+    covers that whole day.
+    """
+    if not value:
+        return None
+    try:
+        bound = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid date: {value}")
+    if bound.tzinfo is None:
+        bound = bound.replace(tzinfo=timezone.utc)
+    if upper and len(value) == 10:
+        bound = bound.replace(hour=23, minute=59, second=59, microsecond=999999)
+    return bound.astimezone(timezone.utc).isoformat()
+
+def _creation_id_condition(start: Optional[str], end: Optional[str]) -> tuple:
+    """Sort key condition and values for a creation_id date range."""
+    if start and end:
+        return ' AND creation_id BETWEEN :start AND :end', {':start': start, ':end': end}
+    if start:
+        return ' AND creation_id >= :start', {':start': start}
+    if end:
+        return ' AND creation_id <= :end', {':end': end}
+    return '', {}
+
+def _batch_get_items(user_id: str, creation_ids: list) -> list:
+    """Fetch items by key with BatchGetItem, retrying unprocessed keys, in the given order."""
+    found = {}
+    for offset in range(0, len(creation_ids), 100):
+        request = {table.name: {'Keys': [
+            {'user_id': user_id, 'creation_id': creation_id}
+            for creation_id in creation_ids[offset:offset + 100]
+        ]}}
+        attempt = 0
+        while request:
+            response = dynamodb.batch_get_item(RequestItems=request)
+            for item in response.get('Responses', {}).get(table.name, []):
+                found[item['creation_id']] = item
+            request = response.get('UnprocessedKeys') or None
+            if request:
+                # Throttled keys; back off before asking again
+                attempt += 1
+                time.sleep(min(0.05 * 2 ** attempt, 1.0))
+    # Keys dropped from the table since they were indexed are skipped
+    return [found[creation_id] for creation_id in creation_ids if creation_id in found]
+
+@app.get("/search/{user_id}")
+async def search_gallery(
+    user_id: str,
+    q: Optional[str] = Query(None, description="Words that must all appear in the prompt"),
+    style: Optional[str] = Query(None),
+    since: Optional[str] = Query(None, description="Earliest creation date or datetime (inclusive)"),
+    until: Optional[str] = Query(None, description="Latest creation date or datetime (inclusive)"),
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = Query(None)
+):
+    """
+    Search a user's animations, newest first.
+
+    Date ranges are a key condition on the `creation_id` sort key. A style
+    filter queries the style index, so only that style's items are read.
+    Keywords go through the in-process prompt index and only the page being
+    returned is fetched, with BatchGetItem. Results are paginated like
+    /gallery, with `next_cursor`.
+    """
+    try:
+        limit = min(limit or settings.search_page_size, settings.gallery_max_page_size)
+        start, end = _search_bound(since, upper=False), _search_bound(until, upper=True)
+        start_key = _decode_cursor(cursor, user_id) if cursor else None
+        last_evaluated_key = None
+
+        if q and prompt_index is not None:
+            matches = await prompt_index.search(user_id, q, style=style, start=start, end=end)
+            if start_key:
+                matches = [creation_id for creation_id in matches if creation_id < start_key['creation_id']]
+            page = matches[:limit]
+            animations = await run_in_threadpool(_batch_get_items, user_id, page) if page else []
+            if len(matches) > limit:
+                last_evaluated_key = {'user_id': user_id, 'creation_id': page[-1]}
+        elif q:
+            raise HTTPException(status_code=400, detail="Keyword search is disabled")
+        else:
+            range_condition, values = _creation_id_condition(start, end)
+            query_kwargs = {
+                'ScanIndexForward': False,
+                'Limit': limit
+            }
+            if style and settings.search_style_index:
+                query_kwargs['IndexName'] = settings.search_style_index
+                query_kwargs['KeyConditionExpression'] = 'user_style = :us' + range_condition
+                query_kwargs['ExpressionAttributeValues'] = {':us': _user_style(user_id, style), **values}
+            else:
+                query_kwargs['KeyConditionExpression'] = 'user_id = :uid' + range_condition
+                query_kwargs['ExpressionAttributeValues'] = {':uid': user_id, **values}
+                if style:
+                    # No style index configured: DynamoDB still reads every item in range
+                    query_kwargs['FilterExpression'] = '#s = :style'
+                    query_kwargs['ExpressionAttributeNames'] = {'#s': 'style'}
+                    query_kwargs['ExpressionAttributeValues'][':style'] = style
+            if start_key:
+                query_kwargs['ExclusiveStartKey'] = start_key
+            response = await run_in_threadpool(table.query, **query_kwargs)
+            animations = response.get('Items', [])
+            last_evaluated_key = response.get('LastEvaluatedKey')
+
+        return {
+            "status": "success",
+            "animations": [_listing_item(animation) for animation in animations],
+            "next_cursor": _encode_cursor(last_evaluated_key) if last_evaluated_key else None
+        }
+
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        logger.exception("Search failed", extra={"user_id": user_id})
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error searching animations: {str(e)}"
+        )
+
+MEDIA_PREFIXES = ("animations", "generations", "derivatives")
+
+def _media_s3_key(user_id: str, key: str) -> str:
+    prefix, _, rest = key.partition("/")
+    if prefix not in MEDIA_PREFIXES or not rest or any(part in ("", ".", "..") for part in rest.split("/")):
+        raise HTTPException(status_code=404, detail="Media not found")
+    return f"{prefix}/{user_id}/{rest}"
+
+def _media_path(s3_key: str) -> str:
+    """Inverse of `_media_s3_key`: the /media path serving an S3 key."""
+    prefix, user_id, rest = s3_key.split("/", 2)
+    return f"/media/{user_id}/{prefix}/{rest}"
+
+def _parse_range(header: Optional[str]) -> Optional[str]:
+    """
+    Return a single `bytes=` range to forward to S3, or None to serve the
+    whole object. Multiple ranges and malformed headers fall back to a
+    full 200 response, which RFC 9110 allows.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start, dash, end = header[len("bytes="):].strip().partition("-")
+    if not dash or not (start or end):
+        return None
+    if (start and not start.isdigit()) or (end and not end.isdigit()):
+        return None
+    if start and end and int(end) < int(start):
+        return None
+    return f"bytes={start}-{end}"
+
+def _media_headers(s3_object: dict) -> dict:
+    headers = {
+        "Accept-Ranges": "bytes",
+        # Keys are unique per upload and never rewritten
+        "Cache-Control": f"private, max-age={settings.media_cache_max_age}, immutable"
+    }
+    if s3_object.get("ETag"):
+        headers["ETag"] = s3_object["ETag"]
+    if s3_object.get("LastModified"):
+        headers["Last-Modified"] = format_datetime(s3_object["LastModified"].astimezone(timezone.utc), usegmt=True)
+    return headers
+
+def _client_error_code(e: ClientError) -> str:
+    return str(e.response.get('Error', {}).get('Code'))
+
+@app.api_route("/media/{user_id}/{key:path}", methods=["GET", "HEAD"])
+async def get_media(request: Request, user_id: str, key: str):
+    """
+    Stream a stored animation, generation or derivative.
+
+    `key` is the object key without the user segment, e.g.
+    `animations/<file>.mp4` or `derivatives/<stem>/thumb.webp`. A single
+    byte range is honoured (206 with Content-Range, 416 when unsatisfiable),
+    so video can start playing and seek before it is fully downloaded. The
+    body is relayed from S3 in `media_chunk_bytes` pieces and never held in
+    memory as a whole.
+    """
+    s3_key = _media_s3_key(user_id, key)
+    get_kwargs = {"Bucket": settings.S3_BUCKET_NAME, "Key": s3_key}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        get_kwargs["IfNoneMatch"] = if_none_match
+
+    byte_range = _parse_range(request.headers.get("range"))
+    if_range = request.headers.get("if-range")
+    if byte_range and if_range is not None:
+        # Only entity-tag validators are supported; a date means "send it all"
+        if if_range.startswith('"'):
+            get_kwargs["IfMatch"] = if_range
+        else:
+            byte_range = None
+    if byte_range:
+        get_kwargs["Range"] = byte_range
+
+    try:
+        if request.method == "HEAD":
+            get_kwargs.pop("Range", None)
+            get_kwargs.pop("IfMatch", None)
+            s3_object = await run_in_threadpool(s3_client.head_object, **get_kwargs)
+        else:
+            try:
+                s3_object = await run_in_threadpool(s3_client.get_object, **get_kwargs)
+            except ClientError as e:
+                if _client_error_code(e) not in ('412', 'PreconditionFailed') or "IfMatch" not in get_kwargs:
+                    raise
+                # If-Range validator is stale: send the current object in full
+                get_kwargs.pop("IfMatch")
+                get_kwargs.pop("Range")
+                s3_object = await run_in_threadpool(s3_client.get_object, **get_kwargs)
+    except ClientError as e:
+        code = _client_error_code(e)
+        if code in ('304', 'NotModified'):
+            return Response(status_code=304, headers={
+                "ETag": if_none_match,
+                "Cache-Control": f"private, max-age={settings.media_cache_max_age}, immutable"
+            })
+        if code in ('404', 'NoSuchKey'):
+            raise HTTPException(status_code=404, detail="Media not found")
+        if code == 'InvalidRange':
+            head = await run_in_threadpool(s3_client.head_object, Bucket=settings.S3_BUCKET_NAME, Key=s3_key)
+            return Response(status_code=416, headers={
+                "Content-Range": f"bytes */{head['ContentLength']}",
+                "Accept-Ranges": "bytes"
+            })
+        logger.exception("Media fetch failed", extra={"s3_key": s3_key})
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error reading media from S3: {str(e)}"
+        )
+
+    headers = _media_headers(s3_object)
+    headers["Content-Length"] = str(s3_object["ContentLength"])
+    media_type = s3_object.get("ContentType") or "application/octet-stream"
+    if request.method == "HEAD":
+        return Response(status_code=200, headers=headers, media_type=media_type)
+
+    status_code = 200
+    if s3_object.get("ContentRange"):
+        status_code = 206
+        headers["Content-Range"] = s3_object["ContentRange"]
+    PAYLOAD_SIZE.observe(s3_object["ContentLength"], kind="media")
+
+    body = s3_object["Body"]
+    # A sync iterator: Starlette pulls each chunk on a worker thread
+    return StreamingResponse(
+        body.iter_chunks(settings.media_chunk_bytes),
+        status_code=status_code,
+        headers=headers,
+        media_type=media_type,
+        background=BackgroundTask(body.close)
+    )
+
 class GenerateRequest(BaseModel):
     prompt: str
 
+async def _copy_generation(source_key: str, user_id: str) -> str:
+    """Server-side copy of an existing generation into the user's prefix."""
+    if source_key.startswith(f"generations/{user_id}/"):
+        return source_key
+    target_key = f"generations/{user_id}/{uuid.uuid4()}.png"
+    await run_in_threadpool(
+        s3_client.copy_object,
+        Bucket=settings.S3_BUCKET_NAME,
+        Key=target_key,
+        CopySource={'Bucket': settings.S3_BUCKET_NAME, 'Key': source_key},
+        MetadataDirective='COPY'
+    )
+    return target_key
+
+async def run_generation(user_id: str, style: str, prompt: str, use_cache: bool = True) -> dict:
+    """
+    Generate an image and store it under generations/{user_id}/.
+
+    Shared by the synchronous endpoint and the job workers. Failures are
+    raised as HTTPException so both paths report the same detail. When the
+    generation cache is enabled, an identical earlier payload is served from
+    its stored object instead of calling SDXL again.
+    """
+    use_cache = use_cache and generation_cache is not None
+    cache_key = payload_key(build_payload(prompt, style))
+    if use_cache:
+        cached = await generation_cache.get(cache_key)
+        if cached is not None:
+            try:
+                url = await _copy_generation(cached["s3_key"], user_id)
+            except ClientError as e:
+                # The cached object is gone; fall back to a fresh generation
+                logger.warning("Stale generation cache entry", extra={"cache_key": cache_key, "error": str(e)})
+                await generation_cache.invalidate(cache_key)
+            else:
+                if url != cached["s3_key"]:
+                    await _record_generation(user_id, url, prompt, style)
+                return {
+                    "status": "success",
+                    "url": url,
+                    "metadata": {**cached["metadata"], "cache": "hit"}
+                }
+
+    # Identical in-flight requests share one inference and upload
+    result, shared = await generation_flights.do(
+        cache_key,
+        lambda: _generate_and_store(user_id, style, prompt, cache_key, use_cache)
+    )
+    if not shared:
+        return result
+
+    try:
+        url = await _copy_generation(result["url"], user_id)
+    except ClientError as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error copying generation in S3: {str(e)}"
+        )
+    if url != result["url"]:
+        await _record_generation(user_id, url, prompt, style)
+    logger.info("Coalesced generation", extra={"user_id": user_id, "source_key": result["url"], "s3_key": url})
+    return {
+        **result,
+        "url": url,
+        "metadata": {**result["metadata"], "coalesced": True}
+    }
+
+async def _generate_and_store(user_id: str, style: str, prompt: str, cache_key: str, use_cache: bool) -> dict:
+    # Generate image
+    result = await generate_styled_image(prompt, style)
+    
+    if result.status != "success":
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to generate image: {result.error}"
+        )
+        
+    # Generate filename
+    timestamp = datetime.now(timezone.utc).isoformat()
+    filename = f"{uuid.uuid4()}.png"
+    
+    try:
+        PAYLOAD_SIZE.observe(len(result.image), kind="generation")
+        
+        # Raw bytes from the endpoint go to S3 as-is
+        await run_in_threadpool(
+            s3_client.put_object,
+            Bucket=settings.S3_BUCKET_NAME,
+            Key=f"generations/{user_id}/{filename}",
+            Body=result.image,
+            ContentType=result.content_type,
+            Metadata={
+                "prompt": prompt,
+                "style": style,
+                "created_at": timestamp
+            }
+        )
+
+        await _record_generation(user_id, f"generations/{user_id}/{filename}", prompt, style, creation_id=timestamp)
+
+        if use_cache:
+            await generation_cache.put(cache_key, f"generations/{user_id}/{filename}", result.metadata)
+        
+        return {
+            "status": "success",
+            "url": f"generations/{user_id}/{filename}",
+            "metadata": {
+                **result.metadata,
+                "cache": "miss" if use_cache else "bypass",
+                "coalesced": False
+            }
+        }
+        
+    except Exception as e:
+        error_msg = f"Error saving to S3: {str(e)}"
+        logger.exception("Saving generation failed", extra={"user_id": user_id})
+        raise HTTPException(
+            status_code=500,
+            detail=error_msg
+        )
+
+async def _run_generation_job(payload: dict) -> dict:
+    with GENERATIONS_IN_FLIGHT.track(source="job"):
+        return await run_generation(
+            payload["user_id"],
+            payload["style"],
+            payload["prompt"],
+            use_cache=payload.get("cache", True)
+        )
+
+generation_jobs = JobQueue(
+    _run_generation_job,
+    concurrency=settings.generation_workers,
+    redis_url=settings.redis_url,
+    job_ttl=settings.job_ttl,
+    name="generation"
+)
+
 @app.post("/generate/{user_id}")
 async def generate_image(
     user_id: str,
     style: str = Query(..., enum=["anime", "cartoon", "realistic"]),
-    body: GenerateRequest = Body(...)
+    body: GenerateRequest = Body(...),
+    wait: bool = Query(True),
+    cache: bool = Query(True)
 ):
-    print(f"\n=== Generation Request ===")
-    print(f"User ID: {user_id}")
-    print(f"Style: {style}")
-    print(f"Prompt: {body.prompt}")
-    
+    """
+    Generate an image for a user.
+
+    With `wait=false` the request is queued for the generation worker pool
+    and a job id is returned immediately (202); poll `GET /jobs/{job_id}` or
+    connect to `/jobs/{job_id}/ws` for the final S3 key. `cache=false`
+    forces a fresh generation when the generation cache is enabled.
+    """
+    logger.info("Generation requested", extra={"user_id": user_id, "style": style, "wait": wait})
     try:
-        # Generate image
-        result = await generate_styled_image(body.prompt, style)
-        
-        if result["status"] != "success":
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to generate image: {result.get('error')}"
-            )
-            
-        # Generate filename
-        timestamp = datetime.now(timezone.utc).isoformat()
-        filename = f"{uuid.uuid4()}.png"
-        print(f"\nGenerated Filename: {filename}")
-        
-        try:
-            print("\nProcessing image data...")
-            image_data = base64.b64decode(result["image"])
-            
-            print("\nUploading to S3...")
-            s3_client.put_object(
-                Bucket=settings.S3_BUCKET_NAME,
-                Key=f"generations/{user_id}/{filename}",
-                Body=image_data,
-                ContentType="image/png",
-                Metadata={
-                    "prompt": body.prompt,
-                    "style": style,
-                    "created_at": timestamp
-                }
-            )
-            print("S3 upload successful")
-            
-            response_data = {
-                "status": "success",
-                "url": f"generations/{user_id}/{filename}",
-                "metadata": result["metadata"]
-            }
-            print("\nResponse Data:", response_data)
-            return response_data
-            
-        except Exception as e:
-            error_msg = f"Error saving to S3: {str(e)}"
-            print(f"\nError: {error_msg}")
-            print(f"Exception details: {type(e).__name__}: {str(e)}")
-            raise HTTPException(
-                status_code=500,
-                detail=error_msg
-            )
+        if not wait:
+            job = await generation_jobs.submit({
+                "user_id": user_id,
+                "style": style,
+                "prompt": body.prompt,
+                "cache": cache
+            })
+            return ORJSONResponse(status_code=202, content={
+                "status": job["status"],
+                "job_id": job["job_id"],
+                "status_url": f"/jobs/{job['job_id']}"
+            })
+
+        with GENERATIONS_IN_FLIGHT.track(source="request"):
+            response_data = await run_generation(user_id, style, body.prompt, use_cache=cache)
+        logger.info("Generation finished", extra={
+            "user_id": user_id,
+            "s3_key": response_data["url"],
+            "cache": response_data["metadata"].get("cache"),
+            "coalesced": response_data["metadata"].get("coalesced")
+        })
+        return response_data
             
     except HTTPException as he:
-        print(f"\nHTTP Exception: {str(he)}")
+        logger.warning("Generation failed", extra={"user_id": user_id, "status": he.status_code, "detail": he.detail})
         raise he
     except Exception as e:
         error_msg = f"Error in image generation: {str(e)}"
-        print(f"\nUnexpected error: {error_msg}")
-        print(f"Exception details: {type(e).__name__}: {str(e)}")
+        logger.exception("Generation failed", extra={"user_id": user_id})
         raise HTTPException(
             status_code=500,
             detail=error_msg
         )
-    
 
+@app.get("/stats/generation")
+async def generation_stats():
+    return {
+        "single_flight": generation_flights.stats(),
+        "batching": batch_stats(),
+        "cache": None if generation_cache is None else {
+            "hits": generation_cache.hits,
+            "misses": generation_cache.misses
+        }
+    }
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await generation_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.websocket("/jobs/{job_id}/ws")
+async def watch_job(websocket: WebSocket, job_id: str):
+    """Push the job record on every status change until it finishes."""
+    await websocket.accept()
+    try:
+        last_status = None
+        while True:
+            job = await generation_jobs.get(job_id)
+            if job is None:
+                await websocket.send_json({"job_id": job_id, "status": "not_found"})
+                break
+            if job["status"] != last_status:
+                await websocket.send_json(job)
+                last_status = job["status"]
+            if job["status"] in TERMINAL_STATUSES:
+                break
+            await asyncio.sleep(settings.job_poll_interval)
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
@@ -0,0 +1,130 @@
+"""
+Create and backfill the DynamoDB index behind `/search?style=`.
+
+Style search reads a global secondary index keyed on `user_style`
+("<user_id>#<style>") with `creation_id` as the range key, projecting all
+attributes. Uploads and generations write `user_style` from the commit that
+added search on; older items need it backfilled before the index sees them.
+Until both steps are done the API filters the base table instead.
+
+    python scripts/style_index.py create      # add the GSI to the table
+    python scripts/style_index.py backfill    # set user_style on older items
+    python scripts/style_index.py status      # index state and items left
+
+Once `status` reports the index ACTIVE and nothing left to backfill, set
+SEARCH_STYLE_INDEX=user_style-creation_id-index for the API.
+"""
+import argparse
+import os
+import sys
+import time
+
+import boto3
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import get_settings
+
+DEFAULT_INDEX = "user_style-creation_id-index"
+
+
+def dynamodb_resource(settings):
+    return boto3.resource(
+        'dynamodb',
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+        region_name=settings.AWS_REGION
+    )
+
+
+def create_index(table, index_name: str):
+    table.meta.client.update_table(
+        TableName=table.name,
+        AttributeDefinitions=[
+            {'AttributeName': 'user_style', 'AttributeType': 'S'},
+            {'AttributeName': 'creation_id', 'AttributeType': 'S'}
+        ],
+        GlobalSecondaryIndexUpdates=[{
+            'Create': {
+                'IndexName': index_name,
+                'KeySchema': [
+                    {'AttributeName': 'user_style', 'KeyType': 'HASH'},
+                    {'AttributeName': 'creation_id', 'KeyType': 'RANGE'}
+                ],
+                'Projection': {'ProjectionType': 'ALL'}
+            }
+        }]
+    )
+    print(f"Creating {index_name} on {table.name}; run `status` until it is ACTIVE")
+
+
+def missing_user_style(table):
+    """Items with a style but no user_style, a scan page at a time."""
+    scan_kwargs = {
+        'FilterExpression': 'attribute_exists(#s) AND attribute_not_exists(user_style)',
+        'ProjectionExpression': 'user_id, creation_id, #s',
+        'ExpressionAttributeNames': {'#s': 'style'}
+    }
+    while True:
+        response = table.scan(**scan_kwargs)
+        for item in response.get('Items', []):
+            # Uploads without a style store it as NULL
+            if isinstance(item.get('style'), str) and item['style']:
+                yield item
+        if 'LastEvaluatedKey' not in response:
+            return
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def backfill(table, dry_run: bool, rate: float):
+    updated = 0
+    for item in missing_user_style(table):
+        if not dry_run:
+            try:
+                table.update_item(
+                    Key={'user_id': item['user_id'], 'creation_id': item['creation_id']},
+                    UpdateExpression='SET user_style = :us',
+                    # Never resurrect an item deleted since the scan
+                    ConditionExpression='attribute_exists(creation_id)',
+                    ExpressionAttributeValues={':us': f"{item['user_id']}#{item['style']}"}
+                )
+            except table.meta.client.exceptions.ConditionalCheckFailedException:
+                continue
+            if rate:
+                time.sleep(1 / rate)
+        updated += 1
+    print(f"{'Would update' if dry_run else 'Updated'} {updated} items")
+
+
+def status(table, index_name: str):
+    table.reload()
+    indexes = {index['IndexName']: index for index in table.global_secondary_indexes or []}
+    index = indexes.get(index_name)
+    if index is None:
+        print(f"{index_name}: missing")
+    else:
+        backfilling = " (backfilling)" if index.get('Backfilling') else ""
+        print(f"{index_name}: {index['IndexStatus']}{backfilling}")
+    print(f"Items without user_style: {sum(1 for _ in missing_user_style(table))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("create", "backfill", "status"))
+    parser.add_argument("--index", default=DEFAULT_INDEX)
+    parser.add_argument("--dry-run", action="store_true", help="backfill: only count the items")
+    parser.add_argument("--rate", type=float, default=0, help="backfill: max updates per second, 0 for no limit")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    table = dynamodb_resource(settings).Table(settings.dynamodb_table_name)
+    if args.command == "create":
+        create_index(table, args.index)
+    elif args.command == "backfill":
+        backfill(table, args.dry_run, args.rate)
+    else:
+        status(table, args.index)
+
+
+if __name__ == "__main__":
+    main()
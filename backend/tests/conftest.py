@@ -0,0 +1,40 @@
+import os
+import sys
+
+import pytest
+
+# Tests import modules the way the app does when run from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "test")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "test")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("WARMUP_ENABLED", "false")
+os.environ.setdefault("DERIVATIVES_ENABLED", "false")
+
+
+@pytest.fixture
+def app():
+    """
+    The API with the in-memory S3/DynamoDB stand-ins from benchmarks/local_aws.py
+    swapped in after startup, as the benchmark suite does. Yields
+    (TestClient, FakeS3Client, FakeTable).
+    """
+    from fastapi.testclient import TestClient
+
+    import main
+    from benchmarks.local_aws import FakeDynamoDB, FakeS3Client, FakeTable
+    from helpers.gallerycache import GalleryCache
+
+    s3, table = FakeS3Client(), FakeTable()
+    with TestClient(main.app) as client:
+        main.s3_client = s3
+        main.table = table
+        main.dynamodb = FakeDynamoDB(table)
+        main.s3_fetcher.s3_client = s3
+        main.derivative_pipeline = None
+        if main.prompt_index is not None:
+            main.prompt_index.table = table
+        if main.gallery_cache is not None:
+            main.gallery_cache = GalleryCache()
+        yield client, s3, table
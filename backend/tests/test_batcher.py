@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from helpers.batcher import MicroBatcher
+
+
+class Recorder:
+    def __init__(self, results=None):
+        self.batches = []
+        self.results = results
+
+    async def __call__(self, group, items):
+        self.batches.append((group, list(items)))
+        await asyncio.sleep(0)
+        return self.results(items) if self.results else [f"{group}:{item}" for item in items]
+
+
+def test_full_batch_is_dispatched_without_waiting():
+    dispatch = Recorder()
+    batcher = MicroBatcher(dispatch, max_batch_size=3, max_wait_ms=10_000)
+
+    async def run():
+        return await asyncio.wait_for(asyncio.gather(*(batcher.submit("cartoon", i) for i in range(3))), 1)
+
+    assert asyncio.run(run()) == ["cartoon:0", "cartoon:1", "cartoon:2"]
+    assert dispatch.batches == [("cartoon", [0, 1, 2])]
+
+
+def test_partial_batch_is_dispatched_after_max_wait():
+    dispatch = Recorder()
+    batcher = MicroBatcher(dispatch, max_batch_size=8, max_wait_ms=10)
+
+    async def run():
+        return await asyncio.gather(batcher.submit("anime", "a"), batcher.submit("anime", "b"))
+
+    assert asyncio.run(run()) == ["anime:a", "anime:b"]
+    assert dispatch.batches == [("anime", ["a", "b"])]
+    assert batcher.stats() == {"batches": 1, "items": 2, "mean_batch_size": 2.0}
+
+
+def test_groups_are_batched_separately():
+    dispatch = Recorder()
+    batcher = MicroBatcher(dispatch, max_batch_size=2, max_wait_ms=10)
+
+    async def run():
+        return await asyncio.gather(
+            batcher.submit("anime", 1), batcher.submit("cartoon", 2), batcher.submit("anime", 3)
+        )
+
+    assert asyncio.run(run()) == ["anime:1", "cartoon:2", "anime:3"]
+    assert sorted(dispatch.batches) == [("anime", [1, 3]), ("cartoon", [2])]
+
+
+def test_exceptions_fail_only_their_item():
+    dispatch = Recorder(lambda items: [ValueError(item) if item == "bad" else item for item in items])
+    batcher = MicroBatcher(dispatch, max_batch_size=2, max_wait_ms=10)
+
+    async def run():
+        return await asyncio.gather(batcher.submit("g", "ok"), batcher.submit("g", "bad"), return_exceptions=True)
+
+    ok, bad = asyncio.run(run())
+    assert ok == "ok"
+    assert isinstance(bad, ValueError)
+
+
+@pytest.mark.parametrize("results", [lambda items: items[:-1], None])
+def test_dispatch_failures_fail_the_whole_batch(results):
+    async def broken(group, items):
+        if results is None:
+            raise ConnectionError("endpoint down")
+        return results(items)
+
+    batcher = MicroBatcher(broken, max_batch_size=2, max_wait_ms=10)
+
+    async def run():
+        return await asyncio.gather(batcher.submit("g", 1), batcher.submit("g", 2), return_exceptions=True)
+
+    assert all(isinstance(result, Exception) for result in asyncio.run(run()))
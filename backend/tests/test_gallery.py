@@ -0,0 +1,199 @@
+import asyncio
+import base64
+import itertools
+import time
+from email.utils import parsedate_to_datetime
+
+import pytest
+from fastapi import HTTPException
+
+from helpers.gallerycache import GalleryCache
+
+
+def upload(client, name="a.png", user_id="u1"):
+    response = client.post(f"/upload/{user_id}", files={"file": (name, b"\x89PNG" + name.encode(), "image/png")})
+    assert response.status_code == 200
+
+
+def test_decode_cursor_round_trip():
+    from main import _decode_cursor, _encode_cursor
+
+    key = {"user_id": "u1", "creation_id": "2024-01-01T00:00:00+00:00"}
+    assert _decode_cursor(_encode_cursor(key), "u1") == key
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    base64.urlsafe_b64encode(b"not json").decode(),
+    base64.urlsafe_b64encode(b'["a list"]').decode(),
+    base64.urlsafe_b64encode(b'{"user_id": "someone-else", "creation_id": "x"}').decode(),
+])
+def test_decode_cursor_rejects_foreign_or_garbled_cursors(cursor):
+    from main import _decode_cursor
+
+    with pytest.raises(HTTPException) as error:
+        _decode_cursor(cursor, "u1")
+    assert error.value.status_code == 400
+
+
+def test_gallery_cache_invalidation_moves_the_generation():
+    cache = GalleryCache(ttl=60)
+
+    async def run():
+        generation = await cache.generation("u1")
+        await cache.put("u1", generation.token, "page", {"animations": []})
+        assert await cache.get("u1", generation.token, "page") == {"animations": []}
+
+        await cache.invalidate("u1")
+        fresh = await cache.generation("u1")
+        assert fresh.token != generation.token
+        assert fresh.updated_at >= generation.updated_at
+        assert await cache.get("u1", fresh.token, "page") is None
+        # Other users keep theirs
+        assert await cache.generation("u2") == await cache.generation("u2")
+
+    asyncio.run(run())
+
+
+def test_gallery_cache_is_bounded_by_page_bytes():
+    cache = GalleryCache(max_bytes=4096, ttl=60)
+
+    async def run():
+        for variant in ("a", "b", "c"):
+            await cache.put("u1", "1", variant, {"etag": variant, "page": "x" * 1500})
+        # The oldest page made room for the newest
+        assert await cache.get("u1", "1", "a") is None
+        assert (await cache.get("u1", "1", "c"))["etag"] == "c"
+
+        await cache.put("u1", "1", "huge", {"etag": "huge", "page": "x" * 5000})
+        assert await cache.get("u1", "1", "huge") is None
+        assert await cache.get("u1", "1", "c") is not None
+
+    asyncio.run(run())
+
+
+def test_oversized_page_keeps_only_validators(app, monkeypatch):
+    import main
+
+    client, _, _ = app
+    upload(client, "a.png")
+    monkeypatch.setattr(main.settings, "gallery_cache_page_max_bytes", 16)
+
+    first = client.get("/gallery/u1", params={"inline": "true"})
+    assert first.json()["animations"][0]["image_data"]
+    assert client.get("/gallery/u1", params={"inline": "true"}).json() == first.json()
+    revalidated = client.get("/gallery/u1", params={"inline": "true"}, headers={"If-None-Match": first.headers["etag"]})
+    assert revalidated.status_code == 304
+
+
+def test_cached_page_matches_the_rendered_one(app):
+    client, _, _ = app
+    upload(client, "a.png")
+
+    first = client.get("/gallery/u1")
+    cached = client.get("/gallery/u1")
+    assert cached.headers["content-type"] == "application/json"
+    assert cached.content == first.content
+
+
+def test_pages_follow_the_cursor(app):
+    client, _, _ = app
+    for i in range(5):
+        upload(client, f"{i}.png")
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        page = client.get("/gallery/u1", params=params).json()
+        seen += [item["original_filename"] for item in page["animations"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert seen == ["4.png", "3.png", "2.png", "1.png", "0.png"]
+
+
+def test_revalidation_and_invalidation_on_write(app):
+    client, _, table = app
+    upload(client, "a.png")
+
+    first = client.get("/gallery/u1")
+    etag = first.headers["etag"]
+    queries = table.calls
+    assert client.get("/gallery/u1", headers={"If-None-Match": etag}).status_code == 304
+    assert table.calls == queries
+
+    upload(client, "b.png")
+    changed = client.get("/gallery/u1", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert len(changed.json()["animations"]) == 2
+
+
+def test_partial_inline_page_is_not_revalidated(app):
+    client, s3, _ = app
+    upload(client, "a.png")
+    s3_key = client.get("/gallery/u1").json()["animations"][0]["s3_url"]
+    body = s3.get_object(Bucket="stickgenusers", Key=s3_key)["Body"].read()
+    s3.delete_object(Bucket="stickgenusers", Key=s3_key)
+
+    partial = client.get("/gallery/u1", params={"inline": "true"})
+    assert partial.json()["animations"][0]["error"]
+    assert "etag" not in partial.headers
+    assert partial.headers["cache-control"] == "no-store"
+
+    s3.put_object(Bucket="stickgenusers", Key=s3_key, Body=body, ContentType="image/png")
+    repaired = client.get("/gallery/u1", params={"inline": "true"}, headers={"If-None-Match": "W/\"stale\""})
+    assert repaired.status_code == 200
+    assert repaired.json()["animations"][0]["image_data"] == base64.b64encode(body).decode()
+
+
+def test_rerendered_page_keeps_its_etag(app):
+    client, s3, _ = app
+    upload(client, "a.png")
+    # Real presigned URLs carry a signing time, so every render differs
+    renders = itertools.count()
+    sign = s3.generate_presigned_url
+    s3.generate_presigned_url = lambda *args, **kwargs: f"{sign(*args, **kwargs)}&X-Amz-Date={next(renders)}"
+
+    import main
+
+    first = client.get("/gallery/u1")
+    main.gallery_cache = GalleryCache()
+    again = client.get("/gallery/u1")
+    assert again.json()["animations"][0]["url"] != first.json()["animations"][0]["url"]
+    assert again.headers["etag"] == first.headers["etag"]
+
+    main.gallery_cache = GalleryCache()
+    signed = next(renders)
+    revalidated = client.get("/gallery/u1", headers={"If-None-Match": first.headers["etag"]})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == first.headers["etag"]
+    # Answered from the items alone, without presigning the page again
+    assert next(renders) == signed + 1
+
+
+def test_in_place_update_moves_last_modified(app):
+    import main
+
+    client, _, table = app
+    upload(client, "a.png")
+    first = client.get("/gallery/u1")
+    since = first.headers["last-modified"]
+    assert client.get("/gallery/u1", headers={"If-Modified-Since": since}).status_code == 304
+
+    # A derivative render fills in thumbnails without adding a newer item
+    time.sleep(1)
+    creation_id = first.json()["animations"][0]["animation_id"]
+    table.update_item(
+        Key={"user_id": "u1", "creation_id": creation_id},
+        UpdateExpression="SET derivatives = :d",
+        ExpressionAttributeValues={":d": {"thumb_webp": f"derivatives/u1/{creation_id}/thumb.webp"}}
+    )
+    asyncio.run(main._invalidate_gallery("u1"))
+
+    updated = client.get("/gallery/u1", headers={"If-Modified-Since": since})
+    assert updated.status_code == 200
+    assert updated.json()["animations"][0]["thumbnail_urls"]
+    assert parsedate_to_datetime(updated.headers["last-modified"]) > parsedate_to_datetime(since)
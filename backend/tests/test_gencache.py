@@ -0,0 +1,47 @@
+import asyncio
+
+from botocore.exceptions import EndpointConnectionError
+
+from helpers.gencache import GenerationCache
+
+
+class UnreachableS3:
+    def __getattr__(self, name):
+        def call(**kwargs):
+            raise EndpointConnectionError(endpoint_url="https://s3.amazonaws.com")
+        return call
+
+
+class UnreachableRedis:
+    async def get(self, key):
+        raise ConnectionError("Connection refused")
+
+    async def set(self, key, value, ex=None):
+        raise ConnectionError("Connection refused")
+
+    async def delete(self, key):
+        raise ConnectionError("Connection refused")
+
+
+def test_unreachable_s3_tier_is_a_miss():
+    cache = GenerationCache(UnreachableS3(), "bucket")
+
+    async def run():
+        assert await cache.get("key") is None
+        await cache.put("key", "generations/u/a.png", {})
+        assert (await cache.get("key"))["s3_key"] == "generations/u/a.png"
+        await cache.invalidate("key")
+        assert await cache.get("key") is None
+
+    asyncio.run(run())
+
+
+def test_unreachable_redis_tier_is_a_miss():
+    cache = GenerationCache(None, "bucket")
+    cache._redis = UnreachableRedis()
+
+    async def run():
+        assert await cache.get("key") is None
+        await cache.invalidate("key")
+
+    asyncio.run(run())
@@ -0,0 +1,101 @@
+import pytest
+
+BODY = bytes(range(256)) * 40  # 10240 bytes
+URL = "/media/u1/animations/clip.mp4"
+
+
+@pytest.fixture
+def media(app):
+    client, s3, _ = app
+    etag = s3.put_object(Bucket="stickgenusers", Key="animations/u1/clip.mp4", Body=BODY, ContentType="video/mp4")["ETag"]
+    return client, etag
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("bytes=0-99", "bytes=0-99"),
+    ("bytes=100-", "bytes=100-"),
+    ("bytes=-500", "bytes=-500"),
+    ("bytes= 5-9", "bytes=5-9"),
+    ("bytes=0-1,5-9", None),
+    ("bytes=9-5", None),
+    ("bytes=-", None),
+    ("bytes=a-b", None),
+    ("items=0-9", None),
+])
+def test_parse_range(header, expected):
+    from main import _parse_range
+    assert _parse_range(header) == expected
+
+
+def test_full_body(media):
+    client, etag = media
+    response = client.get(URL)
+    assert response.status_code == 200
+    assert response.content == BODY
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["etag"] == etag
+
+
+def test_range(media):
+    client, _ = media
+    response = client.get(URL, headers={"Range": "bytes=100-199"})
+    assert response.status_code == 206
+    assert response.content == BODY[100:200]
+    assert response.headers["content-range"] == f"bytes 100-199/{len(BODY)}"
+    assert response.headers["content-length"] == "100"
+
+
+def test_suffix_range(media):
+    client, _ = media
+    response = client.get(URL, headers={"Range": "bytes=-10"})
+    assert response.status_code == 206
+    assert response.content == BODY[-10:]
+
+
+def test_unsatisfiable_range(media):
+    client, _ = media
+    response = client.get(URL, headers={"Range": f"bytes={len(BODY)}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(BODY)}"
+
+
+def test_if_range_current_etag_sends_range(media):
+    client, etag = media
+    response = client.get(URL, headers={"Range": "bytes=0-9", "If-Range": etag})
+    assert response.status_code == 206
+    assert response.content == BODY[:10]
+
+
+def test_if_range_stale_etag_sends_everything(media):
+    client, _ = media
+    response = client.get(URL, headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert response.status_code == 200
+    assert response.content == BODY
+
+
+def test_if_range_date_sends_everything(media):
+    client, _ = media
+    response = client.get(URL, headers={"Range": "bytes=0-9", "If-Range": "Wed, 21 Oct 2015 07:28:00 GMT"})
+    assert response.status_code == 200
+    assert response.content == BODY
+
+
+def test_if_none_match(media):
+    client, etag = media
+    response = client.get(URL, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+
+def test_head(media):
+    client, _ = media
+    response = client.head(URL, headers={"Range": "bytes=0-9"})
+    assert response.status_code == 200
+    assert response.headers["content-length"] == str(len(BODY))
+
+
+@pytest.mark.parametrize("key", ["animations/missing.mp4", "secrets/clip.mp4", "animations/../x", "animations/"])
+def test_not_found(media, key):
+    client, _ = media
+    assert client.get(f"/media/u1/{key}").status_code == 404
@@ -0,0 +1,39 @@
+import asyncio
+
+from helpers.batcher import MicroBatcher
+from helpers.metrics import BATCH_SIZE, SINGLE_FLIGHT_CALLS, Counter, Registry
+from helpers.singleflight import SingleFlight
+
+
+def test_counter_help_and_type_name_the_total_series():
+    registry = Registry()
+    counter = registry.register(Counter("requests", "Requests.", ("route",)))
+    counter.inc(route="/ping")
+    assert registry.render().splitlines() == [
+        "# HELP requests_total Requests.",
+        "# TYPE requests_total counter",
+        'requests_total{route="/ping"} 1.0',
+    ]
+
+
+def test_single_flight_and_batches_are_exported():
+    flights = SingleFlight("test_flight")
+    batcher = MicroBatcher(lambda group, items: asyncio.sleep(0, result=items), max_batch_size=3, name="test")
+
+    async def run():
+        release = asyncio.Event()
+
+        async def slow():
+            await release.wait()
+            return 1
+
+        calls = [asyncio.create_task(flights.do("key", slow)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(*calls)
+        await asyncio.gather(*(batcher.submit("g", i) for i in range(3)))
+
+    asyncio.run(run())
+    assert SINGLE_FLIGHT_CALLS.value(flight="test_flight", result="led") == 1
+    assert SINGLE_FLIGHT_CALLS.value(flight="test_flight", result="coalesced") == 2
+    assert BATCH_SIZE.count(batcher="test") == 1
@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+
+
+@pytest.fixture
+def warm_up(app, monkeypatch):
+    """Run `_warm_up` against the fakes with an S3 that fails until told otherwise."""
+    import main
+
+    client, s3, table = app
+    state = {"s3_up": False}
+
+    def head_bucket(Bucket):
+        if not state["s3_up"]:
+            raise ConnectionError("Could not connect to the endpoint URL")
+        return {}
+
+    s3.head_bucket = head_bucket
+    monkeypatch.setattr(main.settings, "warmup_retry_max_interval", 0.01)
+    monkeypatch.setitem(main.readiness, "ready", False)
+    monkeypatch.setitem(main.readiness, "checks", {})
+    return client, state
+
+
+def test_not_ready_while_a_datastore_is_unreachable(warm_up):
+    import main
+
+    client, state = warm_up
+
+    async def run():
+        task = asyncio.create_task(main._warm_up())
+        for _ in range(500):
+            if "s3" in main.readiness["checks"]:
+                break
+            await asyncio.sleep(0.01)
+        assert not main.readiness["ready"]
+        assert main.readiness["checks"]["s3"].startswith("error")
+        assert main.readiness["checks"]["dynamodb"] == "ok"
+
+        state["s3_up"] = True
+        await asyncio.wait_for(task, timeout=5)
+        assert main.readiness["ready"]
+        assert main.readiness["checks"]["s3"] == "ok"
+
+    response = client.get("/ready")
+    assert response.status_code == 503
+    asyncio.run(run())
+    assert client.get("/ready").status_code == 200
+    assert client.get("/ping").json()["live"] is True
@@ -0,0 +1,93 @@
+import asyncio
+import io
+
+import pytest
+from fastapi import UploadFile
+
+from benchmarks.local_aws import FakeS3Client
+from helpers.s3upload import MIN_PART_SIZE, UploadTooLarge, stream_to_s3
+
+MiB = 1024 * 1024
+
+
+class RecordingS3(FakeS3Client):
+    def __init__(self, fail_on_part=None):
+        super().__init__()
+        self.fail_on_part = fail_on_part
+        self.operations = []
+
+    def put_object(self, **kwargs):
+        self.operations.append("put_object")
+        return super().put_object(**kwargs)
+
+    def upload_part(self, **kwargs):
+        self.operations.append("upload_part")
+        if kwargs["PartNumber"] == self.fail_on_part:
+            raise ConnectionError("Connection reset")
+        return super().upload_part(**kwargs)
+
+    def abort_multipart_upload(self, **kwargs):
+        self.operations.append("abort")
+        return super().abort_multipart_upload(**kwargs)
+
+
+def upload(s3, body: bytes, **kwargs) -> int:
+    file = UploadFile(io.BytesIO(body), filename="clip.mp4")
+    return asyncio.run(stream_to_s3(s3, "bucket", "key", file, "video/mp4", **kwargs))
+
+
+def stored(s3) -> bytes:
+    return s3.get_object(Bucket="bucket", Key="key")["Body"].read()
+
+
+def test_small_file_is_one_put():
+    s3 = RecordingS3()
+    body = b"x" * MiB
+    assert upload(s3, body) == len(body)
+    assert s3.operations == ["put_object"]
+    assert stored(s3) == body
+
+
+def test_exactly_one_chunk_is_one_put():
+    s3 = RecordingS3()
+    body = b"x" * MIN_PART_SIZE
+    assert upload(s3, body, chunk_size=MIN_PART_SIZE) == len(body)
+    assert s3.operations == ["put_object"]
+
+
+def test_large_file_is_multipart():
+    s3 = RecordingS3()
+    body = bytes(range(256)) * (12 * MiB // 256)
+    assert upload(s3, body, chunk_size=MIN_PART_SIZE) == len(body)
+    assert s3.operations == ["upload_part"] * 3
+    assert stored(s3) == body
+    assert s3.get_object(Bucket="bucket", Key="key")["ContentType"] == "video/mp4"
+
+
+def test_chunk_size_is_raised_to_the_s3_minimum():
+    s3 = RecordingS3()
+    upload(s3, b"x" * (MIN_PART_SIZE + 1), chunk_size=1024)
+    assert s3.operations == ["upload_part"] * 2
+
+
+def test_oversized_single_chunk_is_rejected_before_writing():
+    s3 = RecordingS3()
+    with pytest.raises(UploadTooLarge):
+        upload(s3, b"x" * MiB, max_size=MiB - 1)
+    assert s3.operations == []
+
+
+def test_oversized_multipart_is_aborted():
+    s3 = RecordingS3()
+    with pytest.raises(UploadTooLarge):
+        upload(s3, b"x" * 12 * MiB, chunk_size=MIN_PART_SIZE, max_size=8 * MiB)
+    assert s3.operations == ["upload_part", "abort"]
+    assert s3._uploads == {}
+
+
+def test_failed_part_is_aborted():
+    s3 = RecordingS3(fail_on_part=2)
+    with pytest.raises(ConnectionError):
+        upload(s3, b"x" * 12 * MiB, chunk_size=MIN_PART_SIZE)
+    assert s3.operations[-1] == "abort"
+    assert s3._uploads == {}
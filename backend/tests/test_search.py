@@ -0,0 +1,68 @@
+import pytest
+
+
+def seed(table, user_id="u1", count=12):
+    styles = ("anime", "cartoon", "realistic")
+    for i in range(count):
+        style = styles[i % 3]
+        table.put_item(Item={
+            "user_id": user_id,
+            "creation_id": f"2024-01-{i + 1:02d}T12:00:00+00:00",
+            "filename": f"{i}.png",
+            "content_type": "image/png",
+            "prompt": f"stick figure {'jumping' if i % 2 else 'running'} number{i}",
+            "style": style,
+            "user_style": f"{user_id}#{style}",
+        })
+
+
+def days(response):
+    assert response.status_code == 200, response.json()
+    return [int(item["animation_id"][8:10]) for item in response.json()["animations"]]
+
+
+def test_date_range_is_inclusive_and_newest_first(app):
+    client, _, table = app
+    seed(table)
+    assert days(client.get("/search/u1", params={"since": "2024-01-03", "until": "2024-01-05"})) == [5, 4, 3]
+
+
+@pytest.mark.parametrize("style_index", [None, "user_style-creation_id-index"])
+def test_style_filter_pages_through_every_match(app, monkeypatch, style_index):
+    import main
+
+    client, _, table = app
+    seed(table)
+    monkeypatch.setattr(main.settings, "search_style_index", style_index)
+
+    found, cursor = [], None
+    while True:
+        params = {"style": "anime", "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/search/u1", params=params)
+        found += days(response)
+        cursor = response.json()["next_cursor"]
+        if not cursor:
+            break
+    assert found == [10, 7, 4, 1]
+
+
+def test_keyword_search_sees_new_uploads(app):
+    client, _, table = app
+    seed(table)
+    assert days(client.get("/search/u1", params={"q": "Jumping", "style": "cartoon"})) == [8, 2]
+
+    client.post(
+        "/upload/u1",
+        params={"style_id": "cartoon"},
+        data={"prompt": "zebra jumping"},
+        files={"file": ("a.png", b"\x89PNG", "image/png")}
+    )
+    results = client.get("/search/u1", params={"q": "zebra"}).json()["animations"]
+    assert [item["prompt"] for item in results] == ["zebra jumping"]
+
+
+def test_invalid_date(app):
+    client, _, _ = app
+    assert client.get("/search/u1", params={"since": "yesterday"}).status_code == 400
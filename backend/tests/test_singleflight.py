@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from helpers.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flights = SingleFlight()
+    runs = 0
+
+    async def work():
+        nonlocal runs
+        runs += 1
+        await asyncio.sleep(0.01)
+        return "image"
+
+    async def run():
+        return await asyncio.gather(*(flights.do("prompt", work) for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert runs == 1
+    assert [result for result, _ in results] == ["image"] * 5
+    assert [shared for _, shared in results] == [False, True, True, True, True]
+    assert flights.stats()["coalesced"] == 4
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_different_keys_run_separately():
+    flights = SingleFlight()
+
+    async def run():
+        return await asyncio.gather(
+            flights.do("a", lambda: asyncio.sleep(0, result="a")),
+            flights.do("b", lambda: asyncio.sleep(0, result="b"))
+        )
+
+    assert asyncio.run(run()) == [("a", False), ("b", False)]
+
+
+def test_errors_reach_every_caller_and_are_not_cached():
+    flights = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("endpoint down")
+
+    async def run():
+        results = await asyncio.gather(*(flights.do("k", fail) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+        # The failure is not remembered
+        return await flights.do("k", lambda: asyncio.sleep(0, result="ok"))
+
+    assert asyncio.run(run()) == ("ok", False)
+
+
+def test_cancelled_follower_does_not_cancel_the_leader():
+    flights = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def run():
+        leader = asyncio.create_task(flights.do("k", work))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flights.do("k", work))
+        await asyncio.sleep(0)
+        follower.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await follower
+        return await leader
+
+    assert asyncio.run(run()) == ("done", False)
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from helpers.stickmap import ENDPOINT, extract_skeletons
+
+
+def blank(size: int = 256) -> np.ndarray:
+    return np.full((size, size), 255, dtype=np.uint8)
+
+
+def random_drawings(count: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    images = []
+    for _ in range(count):
+        image = blank()
+        for _ in range(4):
+            x1, y1, x2, y2 = (int(v) for v in rng.integers(10, 246, 4))
+            cv2.line(image, (x1, y1), (x2, y2), 0, int(rng.integers(1, 6)))
+        images.append(image)
+    return images
+
+
+def test_diagonal_line_has_two_endpoints():
+    image = blank()
+    cv2.line(image, (35, 35), (221, 221), 0, 3)
+    (skeleton,) = extract_skeletons([image])
+    assert skeleton.joints.tolist() == [[36, 36], [221, 221]]
+    assert skeleton.kinds.tolist() == [ENDPOINT, ENDPOINT]
+    assert skeleton.limbs.tolist() == [[0, 1]]
+
+
+def test_empty_drawing_has_no_joints():
+    (skeleton,) = extract_skeletons([blank(64)])
+    assert skeleton.joints.shape == (0, 2)
+    assert skeleton.limbs.shape == (0, 2)
+
+
+def test_batch_matches_single_images():
+    diagonal = blank()
+    cv2.line(diagonal, (35, 35), (221, 221), 0, 3)
+    # Every image at both an even and an odd slot of the batch
+    images = random_drawings(20)
+    images.insert(1, diagonal)
+    images.insert(4, diagonal)
+
+    batch = extract_skeletons(images)
+    assert len(batch) == len(images)
+    for image, batched in zip(images, batch):
+        (single,) = extract_skeletons([image])
+        np.testing.assert_array_equal(batched.joints, single.joints)
+        np.testing.assert_array_equal(batched.kinds, single.kinds)
+        np.testing.assert_array_equal(batched.limbs, single.limbs)
@@ -0,0 +1,47 @@
+def presign_and_post(client, s3, user_id="u1"):
+    presigned = client.post(
+        f"/upload/{user_id}/presign",
+        json={"filename": "clip.png", "content_type": "image/png", "size": 8}
+    ).json()
+    fields = presigned["fields"]
+    # What S3 stores for the presigned POST
+    s3.put_object(
+        Bucket="stickgenusers",
+        Key=presigned["s3_key"],
+        Body=b"\x89PNG1234",
+        ContentType="image/png",
+        Metadata={
+            "original-filename": fields["x-amz-meta-original-filename"],
+            "creation-id": fields["x-amz-meta-creation-id"]
+        }
+    )
+    return presigned["s3_key"]
+
+
+def test_finalize_is_idempotent(app):
+    client, s3, table = app
+    s3_key = presign_and_post(client, s3)
+
+    first = client.post("/upload/u1/finalize", json={"s3_key": s3_key})
+    retry = client.post("/upload/u1/finalize", json={"s3_key": s3_key})
+
+    assert first.status_code == retry.status_code == 200
+    assert first.json() == retry.json()
+    assert table.query(KeyConditionExpression="user_id = :uid", ExpressionAttributeValues={":uid": "u1"})["Count"] == 1
+
+
+def test_finalize_rejects_streamed_upload(app):
+    client, s3, table = app
+    client.post("/upload/u1", files={"file": ("a.png", b"\x89PNG", "image/png")})
+    s3_key = client.get("/gallery/u1").json()["animations"][0]["s3_url"]
+
+    response = client.post("/upload/u1/finalize", json={"s3_key": s3_key})
+
+    assert response.status_code == 409
+    assert len(client.get("/gallery/u1").json()["animations"]) == 1
+
+
+def test_finalize_missing_object(app):
+    client, _, _ = app
+    response = client.post("/upload/u1/finalize", json={"s3_key": "animations/u1/nothing.png"})
+    assert response.status_code == 404
@@ -17,21 +17,43 @@ interface Animation {
   user_id: string
   animation_id: string
   filename: string
-  content_type: string
-  image_data: string
+  content_type: string | null
+  media_url: string
+  thumbnail_media_urls: Record<string, string>
   created_at: string
 }
 
 interface GalleryResponse {
   status: string
   animations: Animation[]
+  next_cursor: string | null
 }
 
+const API_URL = 'http://127.0.0.1:8000'
+
+const VIDEO_EXTENSIONS = ['mp4', 'webm', 'mov', 'm4v']
+
+const mediaSrc = (animation: Animation) => `${API_URL}${animation.media_url}`
+
+// Rendered by the derivative pipeline; absent until it has run
+const derivativeSrc = (animation: Animation, name: string) => {
+  const path = animation.thumbnail_media_urls?.[name]
+  return path ? `${API_URL}${path}` : undefined
+}
+
+// Items from before content_type was recorded fall back to the extension
+const isVideo = (animation: Animation) =>
+  animation.content_type
+    ? animation.content_type.startsWith('video/')
+    : VIDEO_EXTENSIONS.includes(animation.filename.split('.').pop()?.toLowerCase() ?? '')
+
 export default function GalleryPage() {
   const [animations, setAnimations] = useState<Animation[]>([])
   const [isLoading, setIsLoading] = useState(true)
   const [error, setError] = useState<string | null>(null)
   const [currentPage, setCurrentPage] = useState(1)
+  // cursors[n] fetches page n + 1; the first page needs none
+  const [cursors, setCursors] = useState<(string | null)[]>([null])
   const [hasMore, setHasMore] = useState(true)
   const [selectedAnimation, setSelectedAnimation] = useState<Animation | null>(null)
   const itemsPerPage = 9
@@ -53,25 +75,28 @@ export default function GalleryPage() {
       }
 
       const userId = session.user.id
-      const response = await fetch(`http://127.0.0.1:8000/gallery/${userId}`, {
+      // One page of metadata per view; media is streamed from /media
+      const params = new URLSearchParams({ limit: String(itemsPerPage) })
+      const cursor = cursors[currentPage - 1]
+      if (cursor) params.set('cursor', cursor)
+      const response = await fetch(`${API_URL}/gallery/${userId}?${params}`, {
         headers: {
           'Authorization': `Bearer ${session.access_token}`
         }
       })
-      
+
       if (!response.ok) {
         throw new Error('Failed to fetch animations')
       }
 
       const data: GalleryResponse = await response.json()
-      
-      // Implement client-side pagination
-      const startIndex = (currentPage - 1) * itemsPerPage
-      const endIndex = startIndex + itemsPerPage
-      const paginatedAnimations = data.animations.slice(startIndex, endIndex)
-      
-      setHasMore(endIndex < data.animations.length)
-      setAnimations(paginatedAnimations)
+      setCursors(previous => {
+        const next = previous.slice(0, currentPage)
+        next[currentPage] = data.next_cursor
+        return next
+      })
+      setHasMore(data.next_cursor !== null)
+      setAnimations(data.animations)
     } catch (err) {
       setError('Error fetching animations. Please try again later.')
       console.error('Error fetching animations:', err)
@@ -86,13 +111,11 @@ export default function GalleryPage() {
 
   const handleDownload = async (animation: Animation) => {
     try {
-      const byteCharacters = atob(animation.image_data)
-      const byteNumbers = new Array(byteCharacters.length)
-      for (let i = 0; i < byteCharacters.length; i++) {
-        byteNumbers[i] = byteCharacters.charCodeAt(i)
+      const response = await fetch(mediaSrc(animation))
+      if (!response.ok) {
+        throw new Error('Failed to fetch media')
       }
-      const byteArray = new Uint8Array(byteNumbers)
-      const blob = new Blob([byteArray], { type: animation.content_type })
+      const blob = await response.blob()
       
       const url = window.URL.createObjectURL(blob)
       const a = document.createElement('a')
@@ -171,11 +194,31 @@ export default function GalleryPage() {
                 className="border rounded-lg overflow-hidden shadow-sm hover:shadow-md transition-shadow"
               >
                 <div className="aspect-square relative">
-                  <img
-                    src={`data:${animation.content_type};base64,${animation.image_data}`}
-                    alt={animation.filename}
-                    className="w-full h-full object-contain"
-                  />
+                  {derivativeSrc(animation, 'thumb_jpeg') ? (
+                    <picture>
+                      <source srcSet={derivativeSrc(animation, 'thumb_webp')} type="image/webp" />
+                      <img
+                        src={derivativeSrc(animation, 'thumb_jpeg')}
+                        alt={animation.filename}
+                        loading="lazy"
+                        className="w-full h-full object-contain"
+                      />
+                    </picture>
+                  ) : isVideo(animation) ? (
+                    <video
+                      src={mediaSrc(animation)}
+                      preload="metadata"
+                      muted
+                      className="w-full h-full object-contain"
+                    />
+                  ) : (
+                    <img
+                      src={mediaSrc(animation)}
+                      alt={animation.filename}
+                      loading="lazy"
+                      className="w-full h-full object-contain"
+                    />
+                  )}
                 </div>
                 <div className="p-4">
                   <h3 className="font-medium text-lg mb-2 truncate">{animation.filename}</h3>
@@ -236,11 +279,21 @@ export default function GalleryPage() {
           {selectedAnimation && (
             <>
               <div className="aspect-square relative overflow-hidden rounded-lg animate-slideUp">
-                <img
-                  src={`data:${selectedAnimation.content_type};base64,${selectedAnimation.image_data}`}
-                  alt={selectedAnimation.filename}
-                  className="w-full h-full object-contain transition-all duration-300 hover:scale-105 hover:rotate-1"
-                />
+                {isVideo(selectedAnimation) ? (
+                  <video
+                    src={mediaSrc(selectedAnimation)}
+                    poster={derivativeSrc(selectedAnimation, 'poster')}
+                    controls
+                    autoPlay
+                    className="w-full h-full object-contain"
+                  />
+                ) : (
+                  <img
+                    src={mediaSrc(selectedAnimation)}
+                    alt={selectedAnimation.filename}
+                    className="w-full h-full object-contain transition-all duration-300 hover:scale-105 hover:rotate-1"
+                  />
+                )}
               </div>
 
               <div className="mt-4 animate-fadeIn [animation-delay:200ms] opacity-0 [animation-fill-mode:forwards]">
@@ -93,10 +93,6 @@ export default function Upload() {
     setLoading(true)
     setError(null)
 
-    const formData = new FormData()
-    formData.append('file', file)
-    formData.append('user_id', user.id)
-
     try {
       const { data: { session } } = await supabase.auth.getSession()
       if (!session) {
@@ -108,14 +104,51 @@ export default function Upload() {
       console.log(userId)
       console.log('uploading for userid: ' + userId)
 
-      const response = await fetch(`http://127.0.0.1:8000/upload/${userId}`, {
+      // Ask the API for a presigned S3 POST so the file bytes skip the API
+      const presignResponse = await fetch(`http://127.0.0.1:8000/upload/${userId}/presign`, {
         method: 'POST',
         headers: {
-          'Authorization': `Bearer ${session.access_token}`
+          'Authorization': `Bearer ${session.access_token}`,
+          'Content-Type': 'application/json'
         },
+        body: JSON.stringify({
+          filename: file.name,
+          content_type: file.type,
+          size: file.size
+        }),
+      })
+
+      if (!presignResponse.ok) {
+        const errorData = await presignResponse.json()
+        throw new Error(errorData.detail || 'Upload failed')
+      }
+
+      const presigned = await presignResponse.json()
+
+      const formData = new FormData()
+      Object.entries(presigned.fields as Record<string, string>).forEach(([key, value]) => {
+        formData.append(key, value)
+      })
+      formData.append('file', file)
+
+      const s3Response = await fetch(presigned.url, {
+        method: 'POST',
         body: formData,
       })
 
+      if (!s3Response.ok) {
+        throw new Error('Upload to storage failed')
+      }
+
+      const response = await fetch(`http://127.0.0.1:8000/upload/${userId}/finalize`, {
+        method: 'POST',
+        headers: {
+          'Authorization': `Bearer ${session.access_token}`,
+          'Content-Type': 'application/json'
+        },
+        body: JSON.stringify({ s3_key: presigned.s3_key }),
+      })
+
       if (!response.ok) {
         const errorData = await response.json()
         throw new Error(errorData.detail || 'Upload failed')